@@ -0,0 +1,112 @@
+"""
+benchmark_fetch_scheduler.py
+
+Downloads chapters from a local flaky HTTP server with and without the FetchScheduler of webnovel_parser.py.
+ - the server allows `capacity` requests per second and answers 429 (Retry-After: 1) above that
+ - it also fails a share of the requests at random: 503s and dropped connections
+ - both runs use the same thread pool; reports pages downloaded, failures and what the server saw
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from webnovel_parser import FetchScheduler, FetchFailed
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    capacity = 10
+    error_rate = 0.1
+    lock = threading.Lock()
+    recent = []
+    counts = {}
+
+    def log_message(self, *args):
+        pass
+
+    def count(self, what):
+        with self.lock:
+            self.counts[what] = self.counts.get(what, 0) + 1
+
+    def do_GET(self):
+        now = time.monotonic()
+        with self.lock:
+            self.recent[:] = [t for t in self.recent if now - t < 1.0]
+            self.recent.append(now)
+            over_capacity = len(self.recent) > self.capacity
+        if over_capacity:
+            self.count("429")
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.end_headers()
+            return
+        roll = random.random()
+        if roll < self.error_rate / 2:
+            # drop the connection without an answer
+            self.count("dropped")
+            self.close_connection = True
+            return
+        if roll < self.error_rate:
+            self.count("503")
+            self.send_response(503)
+            self.end_headers()
+            return
+        self.count("200")
+        time.sleep(0.02)
+        body = ("<html><body><div id='content'>" + self.path + "</div></body></html>").encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def plain_get(url):
+    response = requests.get(url, timeout=10)
+    if response.status_code != 200:
+        raise FetchFailed("HTTP " + str(response.status_code))
+    return response
+
+def download_all(urls, get, workers: int):
+    ok = failed = 0
+    def fetch(url):
+        try:
+            get(url)
+            return True
+        except (FetchFailed, requests.exceptions.RequestException):
+            return False
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for success in executor.map(fetch, urls):
+            ok += success
+            failed += not success
+    return ok, failed
+
+def run(name, urls, get, workers: int):
+    FlakyHandler.counts.clear()
+    start = time.perf_counter()
+    ok, failed = download_all(urls, get, workers)
+    elapsed = time.perf_counter() - start
+    seen = ", ".join(f"{key}: {value}" for key, value in sorted(FlakyHandler.counts.items()))
+    print(f"{name:<16} {elapsed:6.2f}s   downloaded {ok:3d}, failed {failed:3d}   server saw {seen}")
+
+if __name__ == "__main__":
+    chapters = 100
+    workers = 8
+    seed = 3
+
+    random.seed(seed)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{root}/chapter/{n}.html" for n in range(1, chapters + 1)]
+    print(f"{chapters} chapters, {workers} threads, server capacity {FlakyHandler.capacity} requests/s, "
+          f"{FlakyHandler.error_rate:.0%} random failures")
+
+    run("no scheduler", urls, plain_get, workers)
+    time.sleep(1)
+    scheduler = FetchScheduler(rate=FlakyHandler.capacity * 0.9, burst=workers, retries=4, backoff=0.25,
+                               failure_budget=chapters)
+    run("fetch scheduler", urls, lambda url: scheduler.get(requests, url), workers)
+    print(f"fetch scheduler: {scheduler.requests} requests, {scheduler.retried} retried, "
+          f"failure budget left {scheduler.failure_budget}")
+    server.shutdown()
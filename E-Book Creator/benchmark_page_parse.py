@@ -0,0 +1,73 @@
+"""
+benchmark_page_parse.py
+
+Full-page BeautifulSoup parse against the partial parse of SiteRules.parse_page (webnovel_parser.py),
+over the saved chapter pages in benchmark_fixtures/ (one per supported site).
+ - times parsing the page plus reading the title, content and next chapter link, best of a few rounds
+ - measures the memory the parsed page takes (tracemalloc peak)
+ - checks that both ways give exactly the same title, content and next link
+"""
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from webnovel_parser import SITE_REGISTRY
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+WEBSITE_URL = "https://example.com"
+PAGE_URL = WEBSITE_URL + "/chapter/12.html"
+
+def full_parse(site, html):
+    return BeautifulSoup(html, "lxml")
+
+def partial_parse(site, html):
+    return site.parse_page(html)
+
+def parse_chapter(site, soup):
+    chapter_title = site.title(soup)
+    next_url = site.next_link(soup, WEBSITE_URL, PAGE_URL)
+    return chapter_title, site.content(soup, chapter_title), next_url
+
+def time_parse(parse, site, html, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse_chapter(site, parse(site, html))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def peak_memory(parse, site, html):
+    tracemalloc.start()
+    soup = parse(site, html)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del soup
+    return peak
+
+if __name__ == "__main__":
+    repeat = 20
+
+    print(f"{'site':<14} {'page':>7} {'full':>9} {'partial':>9} {'speedup':>8} {'full mem':>9} {'partial mem':>12}   check")
+    total_full = total_partial = 0.0
+    differences = 0
+    for name in sorted(SITE_REGISTRY.sites):
+        site = SITE_REGISTRY.get(name)
+        with open(os.path.join(FIXTURES, name + ".html"), encoding='utf-8') as f:
+            html = f.read()
+        full_time, full_result = time_parse(full_parse, site, html, repeat)
+        partial_time, partial_result = time_parse(partial_parse, site, html, repeat)
+        full_memory = peak_memory(full_parse, site, html)
+        partial_memory = peak_memory(partial_parse, site, html)
+        same = full_result == partial_result
+        differences += not same
+        total_full += full_time
+        total_partial += partial_time
+        print(f"{name:<14} {len(html) / 1024:5.0f}KB {full_time * 1000:7.2f}ms {partial_time * 1000:7.2f}ms "
+              f"{full_time / max(partial_time, 1e-9):7.1f}x {full_memory / 1024:7.0f}KB {partial_memory / 1024:10.0f}KB   "
+              f"{'same' if same else 'DIFFERENT'}{'' if site.page_filter else ' (full parse)'}")
+    print(f"{'all sites':<14} {'':>7} {total_full * 1000:7.2f}ms {total_partial * 1000:7.2f}ms "
+          f"{total_full / max(total_partial, 1e-9):7.1f}x")
+    print("Outputs identical." if not differences else f"WARNING: {differences} site(s) differ!")
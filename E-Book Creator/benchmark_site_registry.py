@@ -0,0 +1,70 @@
+"""
+benchmark_site_registry.py
+
+Per-site benchmark of the site registry of webnovel_parser.py on the saved chapter pages in benchmark_fixtures/.
+ - one fixture page per supported site, parsed the way start_parsing does (title, content, next chapter link)
+ - times the precompiled selectors of SITE_REGISTRY against compiling every selector again for each page
+ - checks each site's title and next link against benchmark_fixtures/expected.json
+"""
+import json
+import os
+import time
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from webnovel_parser import SITE_REGISTRY, SiteRules
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+WEBSITE_URL = "https://example.com"
+PAGE_URL = WEBSITE_URL + "/chapter/12.html"
+
+def parse_chapter(site, soup):
+    # same order as start_parsing: the next link is read before content() removes the body's links
+    chapter_title = site.title(soup)
+    next_url = site.next_link(soup, WEBSITE_URL, PAGE_URL)
+    return chapter_title, site.content(soup, chapter_title), next_url
+
+def time_site(name, html, repeat: int, precompiled: bool):
+    # the content is cut out of the soup, so every round parses the page again (not timed)
+    with open(SITE_REGISTRY.path, encoding='utf-8') as f:
+        spec = json.load(f)[name]
+    best = None
+    for _ in range(repeat):
+        soup = BeautifulSoup(html, "lxml")
+        start = time.perf_counter()
+        if precompiled:
+            site = SITE_REGISTRY.get(name)
+        else:
+            soupsieve.purge()
+            site = SiteRules(name, spec)
+        result = parse_chapter(site, soup)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+if __name__ == "__main__":
+    repeat = 50
+
+    with open(os.path.join(FIXTURES, "expected.json"), encoding='utf-8') as f:
+        expected = json.load(f)
+    print(f"{'site':<14} {'lxml parse':>10} {'compiled/page':>14} {'precompiled':>12}   check")
+    total_compiled = total_precompiled = 0.0
+    failures = 0
+    for name in sorted(SITE_REGISTRY.sites):
+        with open(os.path.join(FIXTURES, name + ".html"), encoding='utf-8') as f:
+            html = f.read()
+        start = time.perf_counter()
+        BeautifulSoup(html, "lxml")
+        soup_time = time.perf_counter() - start
+        compiled_time, _ = time_site(name, html, repeat, precompiled=False)
+        precompiled_time, (chapter_title, _, next_url) = time_site(name, html, repeat, precompiled=True)
+        ok = expected[name] == {"title": chapter_title, "next": next_url}
+        failures += not ok
+        total_compiled += compiled_time
+        total_precompiled += precompiled_time
+        print(f"{name:<14} {soup_time * 1000:8.2f}ms {compiled_time * 1000:12.3f}ms {precompiled_time * 1000:10.3f}ms   "
+              f"{'ok' if ok else 'MISMATCH: ' + repr((chapter_title, next_url))}")
+    print(f"{'all sites':<14} {'':>10} {total_compiled * 1000:12.3f}ms {total_precompiled * 1000:10.3f}ms   "
+          f"({total_compiled / max(total_precompiled, 1e-9):.1f}x)")
+    print("All sites parsed as expected." if not failures else f"WARNING: {failures} site(s) differ from expected.json!")
@@ -0,0 +1,61 @@
+"""
+benchmark_startup.py
+
+Import-time report for webnovel_parser.py, measured with python -X importtime.
+ - the parser itself, then each backend it loads only when the settings need it: cloudscraper, selenium, deep_translator, PIL
+ - "plain cloudscraper run" (e.g. readnovelfull with a cover image URL): the parser plus cloudscraper
+ - "everything": the parser plus all backends, i.e. what every run paid when they were imported at the top
+ - each case runs in a fresh interpreter; the best of a few rounds is reported
+"""
+import os
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BACKENDS = {
+    "cloudscraper": ["cloudscraper"],
+    "selenium": ["selenium.webdriver", "selenium.webdriver.chrome.options", "selenium.webdriver.firefox.options",
+                 "selenium.webdriver.common.by", "selenium.webdriver.support.ui",
+                 "selenium.webdriver.support.expected_conditions", "selenium.common.exceptions"],
+    "deep_translator": ["deep_translator"],
+    "PIL": ["PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "textwrap"],
+}
+
+def import_time(modules):
+    # total microseconds of the top-level imports reported by -X importtime
+    code = "; ".join("import " + module for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=SCRIPT_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # nested imports are indented and already counted in their parent's cumulative time
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total
+
+def best_of(modules, rounds: int):
+    return min(import_time(modules) for _ in range(rounds))
+
+if __name__ == "__main__":
+    rounds = 10
+
+    parser = best_of(["webnovel_parser"], rounds)
+    print(f"{'webnovel_parser':<26} {parser / 1000:8.1f}ms")
+    everything = ["webnovel_parser"]
+    for backend, modules in BACKENDS.items():
+        # cost on top of the parser, the shared dependencies (requests, lxml...) are already loaded
+        extra = best_of(["webnovel_parser"] + modules, rounds) - parser
+        print(f"  + {backend:<22} {extra / 1000:8.1f}ms   (only when needed)")
+        everything += modules
+    plain = best_of(["webnovel_parser"] + BACKENDS["cloudscraper"], rounds)
+    eager = best_of(everything, rounds)
+    print(f"{'plain cloudscraper run':<26} {plain / 1000:8.1f}ms")
+    print(f"{'everything':<26} {eager / 1000:8.1f}ms")
+    print(f"Startup of a plain cloudscraper run: {plain / 1000:.1f}ms instead of {eager / 1000:.1f}ms "
+          f"({eager / max(plain, 1):.1f}x faster)")
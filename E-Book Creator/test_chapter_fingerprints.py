@@ -0,0 +1,63 @@
+"""
+test_chapter_fingerprints.py
+
+Tests of the ChapterFingerprints duplicate detection of webnovel_parser.py (run with python -m pytest).
+ - the same text under another URL, or one differing only in numbers, is a duplicate
+ - near-identical texts within duplicate_distance simhash bits are found, for any distance setting
+ - image-only or unparsed chapters (text under min_chars) are never duplicates, but their URL is still known
+"""
+import random
+
+import pytest
+
+from webnovel_parser import ChapterFingerprints, chapter_text
+
+def text(seed, length=800):
+    rng = random.Random(seed)
+    return "".join(chr(0x4E00 + rng.randrange(3000)) for _ in range(length))
+
+def test_same_text_under_another_url():
+    fingerprints = ChapterFingerprints()
+    fingerprints.add(1, "/1.html", fingerprints.fingerprint(text(1)))
+    assert fingerprints.duplicate_of("/2.html", fingerprints.fingerprint(text(1))) == "same text as chapter 1"
+    assert fingerprints.duplicate_of("/1.html", fingerprints.fingerprint(text(1))) is None
+    assert fingerprints.duplicate_of("/2.html", fingerprints.fingerprint(text(2))) is None
+
+def test_numbers_are_masked():
+    fingerprints = ChapterFingerprints()
+    fingerprints.add(12, "/12.html", fingerprints.fingerprint(text(1) + " chapter 12"))
+    assert fingerprints.duplicate_of("/13.html", fingerprints.fingerprint(text(1) + " chapter 13")) == "same text as chapter 12"
+
+@pytest.mark.parametrize("distance", [0, 3, 5, 10])
+def test_every_distance_up_to_the_setting_is_found(distance):
+    fingerprints = ChapterFingerprints(distance)
+    digest, simhash_value = fingerprints.fingerprint(text(1))
+    fingerprints.add(1, "/1.html", (digest, simhash_value))
+    rng = random.Random(distance)
+    for bits in range(distance + 2):
+        for _ in range(20):
+            flipped = simhash_value ^ sum(1 << bit for bit in rng.sample(range(64), bits))
+            found = fingerprints.duplicate_of("/2.html", ("other digest", flipped))
+            assert (found is not None) == (bits <= distance)
+
+def test_distance_out_of_range():
+    with pytest.raises(ValueError):
+        ChapterFingerprints(64)
+
+def test_short_chapters_are_not_compared():
+    # image-only chapters: only the title, which chapter_text drops
+    fingerprints = ChapterFingerprints()
+    for number in range(1, 5):
+        content = ("<h1>Chapter " + str(number) + "</h1><p><img src='" + str(number) + ".jpg'/></p>").encode('utf-8')
+        fingerprint = fingerprints.fingerprint(chapter_text(content))
+        assert fingerprint is None
+        assert fingerprints.duplicate_of("/" + str(number) + ".html", fingerprint) is None
+        fingerprints.add(number, "/" + str(number) + ".html", fingerprint)
+    assert fingerprints.urls["/3.html"] == 3
+    assert fingerprints.hashes == {} and fingerprints.bands == {}
+
+def test_min_chars_setting():
+    fingerprints = ChapterFingerprints(min_chars=10)
+    fingerprints.add(1, "/1.html", fingerprints.fingerprint(text(1, 10)))
+    assert fingerprints.duplicate_of("/2.html", fingerprints.fingerprint(text(1, 10))) == "same text as chapter 1"
+    assert fingerprints.fingerprint(text(1, 9)) is None
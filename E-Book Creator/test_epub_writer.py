@@ -0,0 +1,99 @@
+"""
+test_epub_writer.py
+
+Round trip of the StreamingEpubWriter of webnovel_parser.py (run with python -m pytest).
+ - a book streamed chapter by chapter (out of order, with a repeat) is read back with ebooklib
+ - it has the same items and chapter contents as epub.write_epub gives for the same book
+ - a zip missing a chapter is caught by check() and never replaces the book
+StreamingEpubWriter overrides private EpubWriter methods; run this after upgrading EbookLib.
+"""
+import os
+
+import pytest
+from ebooklib import epub
+
+from webnovel_parser import StreamingEpubWriter
+
+CHAPTERS = {number: ("Chapter " + str(number), ("<h1>Chapter " + str(number) + "</h1><p>第" + str(number) + "章 text</p>").encode('utf-8'))
+            for number in range(1, 6)}
+
+def new_book():
+    # set up like EbookCreator.start_parsing
+    book = epub.EpubBook()
+    book.set_cover("cover.jpg", b"\xff\xd8\xff\xe0 not really a jpeg")
+    book.set_title("Round Trip")
+    book.set_language('en')
+    book.add_author("Tester")
+    cover_chapter = epub.EpubHtml(title='Cover Image', file_name='cover_chapter.xhtml', lang='hr')
+    cover_chapter.set_content('<html><body><img src="cover.jpg" alt="cover_image" /></body></html>')
+    book.add_item(cover_chapter)
+    book.toc.append(cover_chapter)
+    book.spine = ['nav', cover_chapter]
+    return book
+
+def finish_book(book):
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.add_item(epub.EpubItem(uid="style_nav", file_name="style/nav.css", media_type="text/css", content='p {text-align: left;}'))
+
+def streamed_book(path, numbers):
+    book = new_book()
+    writer = StreamingEpubWriter(path, book, {})
+    for number in numbers:
+        chapter_title, chapter_content = CHAPTERS[number]
+        writer.add_chapter(number, chapter_title, chapter_content)
+    finish_book(book)
+    return writer
+
+def chapters_of(path):
+    book = epub.read_epub(path)
+    return {item.file_name: item.get_content() for item in book.get_items() if item.file_name.startswith("chap_")}
+
+def test_read_back(tmp_path):
+    path = str(tmp_path / "streamed.epub")
+    streamed_book(path, [3, 1, 5, 2, 4, 3]).finish()
+    assert not os.path.exists(path + ".part")
+    book = epub.read_epub(path)
+    assert book.get_metadata('DC', 'title')[0][0] == "Round Trip"
+    spine = [book.get_item_with_id(idref).file_name for idref, _ in book.spine if book.get_item_with_id(idref)]
+    assert [name for name in spine if name.startswith("chap_")] == ["chap_" + str(n) + ".xhtml" for n in range(1, 6)]
+    assert [link.title for link in book.toc] == ["Cover Image"] + [CHAPTERS[n][0] for n in range(1, 6)]
+    assert book.get_item_with_href("cover.jpg") is not None
+    contents = chapters_of(path)
+    for number in CHAPTERS:
+        assert "第" + str(number) + "章 text" in contents["chap_" + str(number) + ".xhtml"].decode('utf-8')
+
+def test_same_as_write_epub(tmp_path):
+    streamed_path = str(tmp_path / "streamed.epub")
+    streamed_book(streamed_path, [2, 1, 4, 3, 5]).finish()
+    book = new_book()
+    for number in sorted(CHAPTERS):
+        chapter = epub.EpubHtml(title=CHAPTERS[number][0], file_name='chap_' + str(number) + '.xhtml', lang='hr')
+        chapter.content = CHAPTERS[number][1]
+        book.add_item(chapter)
+        book.toc.append(chapter)
+        book.spine.append(chapter)
+    finish_book(book)
+    reference_path = str(tmp_path / "reference.epub")
+    epub.write_epub(reference_path, book, {})
+    assert chapters_of(streamed_path) == chapters_of(reference_path)
+    item_names = lambda path: sorted(item.file_name for item in epub.read_epub(path).get_items())
+    assert item_names(streamed_path) == item_names(reference_path)
+
+def test_incomplete_zip_is_not_kept(tmp_path, monkeypatch):
+    path = str(tmp_path / "book.epub")
+    with open(path, 'wb') as f:
+        f.write(b"previous book")
+    book = new_book()
+    writer = StreamingEpubWriter(path, book, {})
+    # what a changed ebooklib could do: a chapter never makes it into the zip
+    writestr = writer.out.writestr
+    monkeypatch.setattr(writer.out, "writestr",
+                        lambda name, data, *args, **kwargs: None if name.endswith("chap_2.xhtml") else writestr(name, data, *args, **kwargs))
+    for number in (1, 2, 3):
+        writer.add_chapter(number, *CHAPTERS[number])
+    finish_book(book)
+    with pytest.raises(ValueError, match="chap_2.xhtml"):
+        writer.finish()
+    with open(path, 'rb') as f:
+        assert f.read() == b"previous book"
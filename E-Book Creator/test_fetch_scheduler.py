@@ -0,0 +1,134 @@
+"""
+test_fetch_scheduler.py
+
+Tests of the FetchScheduler of webnovel_parser.py against a local flaky stand-in HTTP server (run with python -m pytest).
+ - 503/429 answers and dropped connections are retried until the page comes through
+ - Retry-After is honoured before the next attempt
+ - a spent failure budget (or retry limit) raises FetchFailed instead of retrying forever
+ - the token bucket holds the request rate at about the configured rate
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from webnovel_parser import FetchFailed, FetchScheduler
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    # path -> answers still to give before the page, each (status, Retry-After) or "drop";
+    # every request is logged with the time it arrived
+    failures = {}
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, time.monotonic()))
+        queue = self.failures.get(self.path, [])
+        answer = queue.pop(0) if queue else (200, None)
+        if answer == "drop":
+            # connection closed without a response, requests raises ConnectionError
+            self.close_connection = True
+            return
+        status, retry_after = answer
+        body = b"<html>chapter</html>" if status == 200 else b"<html>busy</html>"
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header('Retry-After', retry_after)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:" + str(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def reset():
+    FlakyHandler.failures = {}
+    FlakyHandler.requests_seen = []
+
+def quick_scheduler(**options):
+    # no pacing and millisecond backoff, so only what a test sets up takes time
+    settings = dict(rate=0, retries=4, backoff=0.01, max_backoff=5.0, failure_budget=30, timeout=5)
+    settings.update(options)
+    return FetchScheduler(**settings)
+
+@pytest.mark.parametrize("failures", [[(503, None)], [(429, None)], [(503, None), (429, None)], ["drop"], ["drop", (503, None)]])
+def test_transient_failures_are_retried(server, failures):
+    FlakyHandler.failures["/1.html"] = list(failures)
+    scheduler = quick_scheduler()
+    response = scheduler.get(requests, server + "/1.html")
+    assert (response.status_code, response.content) == (200, b"<html>chapter</html>")
+    assert len(FlakyHandler.requests_seen) == len(failures) + 1
+    assert scheduler.retried == len(failures)
+
+def test_other_errors_are_not_retried(server):
+    FlakyHandler.failures["/1.html"] = [(404, None)]
+    scheduler = quick_scheduler()
+    assert scheduler.get(requests, server + "/1.html").status_code == 404
+    assert len(FlakyHandler.requests_seen) == 1
+
+def test_retry_after_is_honoured(server):
+    FlakyHandler.failures["/1.html"] = [(503, "1")]
+    scheduler = quick_scheduler()
+    assert scheduler.get(requests, server + "/1.html").status_code == 200
+    (_, first), (_, second) = FlakyHandler.requests_seen
+    assert second - first >= 0.95
+
+def test_retry_after_holds_back_the_whole_host(server):
+    # another page of the same host, asked for by another thread, waits out the Retry-After too
+    FlakyHandler.failures["/1.html"] = [(429, "1")]
+    scheduler = quick_scheduler()
+    worker = threading.Thread(target=scheduler.get, args=(requests, server + "/1.html"))
+    worker.start()
+    time.sleep(0.2)
+    scheduler.get(requests, server + "/2.html")
+    worker.join()
+    first_429 = FlakyHandler.requests_seen[0][1]
+    assert [path for path, _ in FlakyHandler.requests_seen][0] == "/1.html"
+    assert [arrived for path, arrived in FlakyHandler.requests_seen if path == "/2.html"][0] - first_429 >= 0.95
+
+def test_spent_failure_budget_raises(server):
+    FlakyHandler.failures["/1.html"] = [(503, None)] * 50
+    scheduler = quick_scheduler(retries=20, failure_budget=2)
+    with pytest.raises(FetchFailed, match="failure budget used up"):
+        scheduler.get(requests, server + "/1.html")
+    assert len(FlakyHandler.requests_seen) == 3
+    # the budget is shared: the next page is not retried at all
+    FlakyHandler.failures["/2.html"] = ["drop"]
+    with pytest.raises(FetchFailed, match="ConnectionError"):
+        scheduler.get(requests, server + "/2.html")
+    assert len(FlakyHandler.requests_seen) == 4
+
+def test_retry_limit_raises(server):
+    FlakyHandler.failures["/1.html"] = [(503, None)] * 50
+    scheduler = quick_scheduler(retries=2)
+    with pytest.raises(FetchFailed, match="HTTP 503"):
+        scheduler.get(requests, server + "/1.html")
+    assert len(FlakyHandler.requests_seen) == 3
+
+def test_token_bucket_pacing(server):
+    scheduler = quick_scheduler(rate=20.0, burst=1)
+    for number in range(11):
+        scheduler.get(requests, server + "/" + str(number) + ".html")
+    arrivals = [arrived for _, arrived in FlakyHandler.requests_seen]
+    rate = (len(arrivals) - 1) / (arrivals[-1] - arrivals[0])
+    assert 15.0 <= rate <= 21.0
+
+def test_burst_then_pacing(server):
+    # a full bucket lets `burst` requests through at once, then the rate applies
+    scheduler = quick_scheduler(rate=10.0, burst=4)
+    start = time.monotonic()
+    for number in range(4):
+        scheduler.get(requests, server + "/" + str(number) + ".html")
+    assert time.monotonic() - start < 0.3
+    scheduler.get(requests, server + "/4.html")
+    assert time.monotonic() - start >= 0.09
@@ -0,0 +1,140 @@
+"""
+test_http_cache.py
+
+Tests of the HttpCache of webnovel_parser.py against a local stand-in HTTP server (run with python -m pytest).
+ - pages are stored content-addressed and re-validated with If-None-Match / If-Modified-Since
+ - a changed page is downloaded and stored again
+ - error pages (404, 500...) are returned but never cached, nor served offline
+ - offline mode never touches the network
+"""
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from webnovel_parser import HttpCache, NotInHttpCache
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # path -> (status, body, ETag, Last-Modified); every request is logged with its conditional headers
+    pages = {}
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        status, body, etag, last_modified = self.pages.get(self.path, (404, b"<html>Not Found</html>", None, None))
+        if_none_match = self.headers.get('If-None-Match')
+        if_modified_since = self.headers.get('If-Modified-Since')
+        self.requests_seen.append((self.path, if_none_match, if_modified_since))
+        if status == 200 and ((etag and if_none_match == etag) or (last_modified and if_modified_since == last_modified)):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        if last_modified:
+            self.send_header('Last-Modified', last_modified)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:" + str(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def site():
+    StandInHandler.pages = {
+        "/etag.html": (200, "<html>第一章</html>".encode('utf-8'), '"v1"', None),
+        "/modified.html": (200, b"<html>chapter 2</html>", None, "Wed, 01 Jan 2025 00:00:00 GMT"),
+        "/plain.html": (200, b"<html>chapter 3</html>", None, None),
+        "/broken.html": (500, b"<html>Internal Server Error</html>", None, None),
+    }
+    StandInHandler.requests_seen = []
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / "http_cache"))
+    yield cache
+    cache.close()
+
+def test_download_is_stored_content_addressed(server, cache):
+    content = cache.get(requests, server + "/etag.html")
+    assert content == StandInHandler.pages["/etag.html"][1]
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert os.path.exists(os.path.join(cache.directory, "objects", sha256))
+    assert cache.lookup(server + "/etag.html") == (sha256, 200, '"v1"', None)
+    assert cache.misses == 1
+
+def test_revalidate_with_etag(server, cache):
+    first = cache.get(requests, server + "/etag.html")
+    assert cache.get(requests, server + "/etag.html") == first
+    assert StandInHandler.requests_seen == [("/etag.html", None, None), ("/etag.html", '"v1"', None)]
+    assert (cache.misses, cache.revalidated) == (1, 1)
+
+def test_revalidate_with_last_modified(server, cache):
+    first = cache.get(requests, server + "/modified.html")
+    assert cache.get(requests, server + "/modified.html") == first
+    assert StandInHandler.requests_seen[1] == ("/modified.html", None, "Wed, 01 Jan 2025 00:00:00 GMT")
+    assert cache.revalidated == 1
+
+def test_changed_page_is_stored_again(server, cache):
+    cache.get(requests, server + "/etag.html")
+    StandInHandler.pages["/etag.html"] = (200, b"<html>edited</html>", '"v2"', None)
+    assert cache.get(requests, server + "/etag.html") == b"<html>edited</html>"
+    assert cache.lookup(server + "/etag.html")[2] == '"v2"'
+    assert (cache.misses, cache.revalidated) == (2, 0)
+
+def test_page_without_validators_is_downloaded_again(server, cache):
+    cache.get(requests, server + "/plain.html")
+    cache.get(requests, server + "/plain.html")
+    assert StandInHandler.requests_seen == [("/plain.html", None, None)] * 2
+
+@pytest.mark.parametrize("path", ["/missing.html", "/broken.html"])
+def test_error_pages_are_not_cached(server, cache, path):
+    # returned like before (the caller decides what to do with them), but neither stored nor served offline
+    assert cache.get(requests, server + path) == StandInHandler.pages.get(path, (404, b"<html>Not Found</html>"))[1]
+    assert cache.lookup(server + path) is None
+    assert os.listdir(os.path.join(cache.directory, "objects")) == []
+    offline = HttpCache(cache.directory, offline=True)
+    with pytest.raises(NotInHttpCache):
+        offline.get(requests, server + path)
+    offline.close()
+
+def test_old_error_entry_is_dropped(server, cache):
+    # an error page stored by an older version is neither revalidated nor served offline
+    cache.put(server + "/etag.html", b"<html>Not Found</html>", 404, '"v1"')
+    offline = HttpCache(cache.directory, offline=True)
+    with pytest.raises(NotInHttpCache):
+        offline.get(requests, server + "/etag.html")
+    offline.close()
+    cache.put(server + "/etag.html", b"<html>Not Found</html>", 404, '"v1"')
+    assert cache.get(requests, server + "/etag.html") == StandInHandler.pages["/etag.html"][1]
+    assert StandInHandler.requests_seen == [("/etag.html", None, None)]
+    assert cache.lookup(server + "/etag.html")[1] == 200
+
+def test_offline_never_touches_the_network(server, cache):
+    cache.get(requests, server + "/etag.html")
+    StandInHandler.requests_seen = []
+    offline = HttpCache(cache.directory, offline=True)
+    assert offline.get(requests, server + "/etag.html") == StandInHandler.pages["/etag.html"][1]
+    with pytest.raises(NotInHttpCache):
+        offline.get(requests, server + "/modified.html")
+    offline.close()
+    assert StandInHandler.requests_seen == []
+    assert offline.hits == 1
+
+def test_missing_body_file_counts_as_a_miss(server, cache):
+    content = cache.get(requests, server + "/etag.html")
+    os.remove(os.path.join(cache.directory, "objects", hashlib.sha256(content).hexdigest()))
+    assert cache.get(requests, server + "/etag.html") == content
+    assert StandInHandler.requests_seen[1] == ("/etag.html", None, None)
@@ -0,0 +1,90 @@
+"""
+test_next_chapter_link.py
+
+Tests of the next chapter link detection of webnovel_parser.py (run with python -m pytest).
+ - every site of the site registry against its saved page in benchmark_fixtures/ and expected.json
+ - find_next_chapter_anchor on small navigation snippets: phrases, rel/id/class hints, translation fallback
+ - no translation is ever needed for the saved pages
+"""
+import json
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import webnovel_parser
+from webnovel_parser import SITE_REGISTRY, TranslationCache, find_next_chapter_anchor
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+WEBSITE_URL = "https://example.com"
+PAGE_URL = WEBSITE_URL + "/chapter/12.html"
+
+with open(os.path.join(FIXTURES, "expected.json"), encoding='utf-8') as f:
+    EXPECTED = {name: value for name, value in json.load(f).items() if not name.startswith("_comment")}
+
+@pytest.fixture(autouse=True)
+def offline_translations(tmp_path, monkeypatch):
+    # no network and no translation_cache.sqlite3 next to the script; translations are counted
+    cache = TranslationCache(str(tmp_path / "translation_cache.sqlite3"))
+    cache.offline = True
+    monkeypatch.setattr(webnovel_parser, "TRANSLATION_CACHE", cache)
+    yield cache
+    cache.close()
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name + ".html"), encoding='utf-8') as f:
+        return f.read()
+
+def anchors(html):
+    return BeautifulSoup(html, "lxml").find_all("a")
+
+def test_every_site_has_a_fixture():
+    assert sorted(EXPECTED) == sorted(SITE_REGISTRY.sites)
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_next_link_of_saved_page(name, offline_translations):
+    site = SITE_REGISTRY.get(name)
+    soup = site.parse_page(read_fixture(name))
+    assert site.next_link(soup, WEBSITE_URL, PAGE_URL) == EXPECTED[name]["next"]
+    assert offline_translations.misses == 0
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_partial_and_full_parse_agree(name):
+    site = SITE_REGISTRY.get(name)
+    html = read_fixture(name)
+    full = BeautifulSoup(html, "lxml")
+    assert site.next_link(site.parse_page(html), WEBSITE_URL, PAGE_URL) == site.next_link(full, WEBSITE_URL, PAGE_URL)
+
+@pytest.mark.parametrize("text", ["下一章", "下一頁", "下一节", "下章", "後一章",
+                                  "Next Chapter", "NEXT »", "→ 下一页 →"])
+def test_next_phrases(text, offline_translations):
+    links = anchors('<a href="/1.html">上一章</a><a href="/index.html">目录</a><a href="/3.html">' + text + '</a>')
+    assert find_next_chapter_anchor(links)["href"] == "/3.html"
+    assert offline_translations.misses == 0
+
+@pytest.mark.parametrize("attributes", ['rel="next"', 'id="next_chap"', 'class="btn btn-next"', 'id="pager_next"'])
+def test_next_hints(attributes):
+    links = anchors('<a href="/1.html">&lt;&lt;</a><a href="/3.html" ' + attributes + '>&gt;&gt;</a>')
+    assert find_next_chapter_anchor(links)["href"] == "/3.html"
+
+def test_first_match_wins():
+    links = anchors('<a href="/3.html">下一章</a><a href="/4.html">下一页</a>')
+    assert find_next_chapter_anchor(links)["href"] == "/3.html"
+
+def test_anchor_without_href_is_skipped():
+    links = anchors('<a>下一章</a><a href="">下一章</a><a href="/3.html">下一章</a>')
+    assert find_next_chapter_anchor(links)["href"] == "/3.html"
+
+def test_no_next_link(offline_translations):
+    links = anchors('<a href="/1.html">上一章</a><a href="/index.html">目录</a>')
+    assert find_next_chapter_anchor(links) is None
+    # both texts were offered to the translator (offline here) before giving up
+    assert offline_translations.misses == 2
+
+def test_translation_fallback(offline_translations):
+    # a wording the phrase list does not know is still found through the (cached) translation
+    key = ('zh-CN', 'en', "继续阅读")
+    offline_translations.memory[key] = "Next reading"
+    links = anchors('<a href="/1.html">上一章</a><a href="/3.html">继续阅读</a>')
+    assert find_next_chapter_anchor(links)["href"] == "/3.html"
+    assert offline_translations.hits == 1
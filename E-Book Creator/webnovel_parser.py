@@ -1,460 +1,993 @@
 #!/usr/bin/python
 # coding: latin-1
 from bs4 import BeautifulSoup
+import soupsieve
+try:
+    from bs4.filter import ElementFilter
+    PARTIAL_PARSE = True
+except ImportError:
+    # BeautifulSoup before 4.13: chapter pages are always parsed in full
+    ElementFilter = object
+    PARTIAL_PARSE = False
 from ebooklib import epub
 import requests
 import json
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
-import cfscrape
-import cloudscraper
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
-from deep_translator import GoogleTranslator
+import argparse
+import hashlib
+import io
+# cloudscraper, selenium, deep_translator and PIL are imported where they are used,
+# so a run only loads the backends its settings need (see benchmark_startup.py)
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from urllib.parse import urljoin, urlparse
+import queue
+import random
+import sqlite3
+import threading
+import zipfile
 import time
 import os
+import re
 
-class ChapterTitle(object):
-    def parse(self,sitename,soup_obj):
-        method_name='parse_'+str(sitename)
-        self.soup = soup_obj
-        method=getattr(self,method_name,lambda :"invalid")
-        return method()
-    def parse_readnovelfull(self):
-        chapterTitle = self.soup.select_one('a[class="chr-title"]').get('title')
-        if not chapterTitle:
-            chapterTitle = "invalid"
-        return chapterTitle
-    def parse_royalroad(self):
-        chapterTitle = self.soup.title.string
-        if not chapterTitle:
-            chapterTitle = "invalid"
-        return chapterTitle
-    def parse_scribblehub(self):
-        chapterTitle = self.soup.title.string
-        if not chapterTitle:
-            chapterTitle = "invalid"
-        return chapterTitle
-    def parse_boxnovel(self):
-        chapterTitle = self.soup.title.string
-        if not chapterTitle:
-            chapterTitle = "invalid"
-        return chapterTitle
-    def parse_readwebnovels(self):
-        chapterTitle = self.soup.title.string
-        if not chapterTitle:
-            chapterTitle = "invalid"
-        return chapterTitle
-    def parse_instadoses(self):
-        chapterTitle = self.soup.select_one('h1[id="chapter-heading"]')
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_novelfun(self):
-        chapterTitle = self.soup.select_one('h1[class="css-1ch487y"]')
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_ranobes(self):
-        chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_tracan(self):
-        chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_shuhaige(self):
-        chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"  
-        return chapterTitle
-    def parse_tomatomtl(self):
-        chapterTitle = self.soup.select_one('h1[class="chapter_title"]')
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_biquge(self):
-        chapterTitle = self.soup.select_one('div[class="book"] h1')
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"
-        return chapterTitle
-    def parse_xszj(self):
-        chapterTitle = self.soup.select_one('h1[class="bookname"]').text
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_dxs(self):
-        chapterTitle = self.soup.select_one('h1[class="chaptername"]').text
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_tongrenquan(self):
-        chapterTitle = self.soup.select_one('h1').text
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_novel543(self):
-        chapterTitle = self.soup.title.string
-        if not chapterTitle:
-            chapterTitle = "invalid"
-        return chapterTitle
-    def parse_bixiange(self):
-        chapterTitle = self.soup.select_one('h1').text
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_quanben(self):
-        chapterTitle = self.soup.select_one('h1[class="headline"]').text
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
-    def parse_69shubatw(self):
-        chapterTitle = self.soup.select_one('h1[class="nr_title"]').text
-        if not chapterTitle:
-            chapterTitle = self.soup.title.string if self.soup.title.string else "invalid"        
-        return chapterTitle
+def next_numbered_chapter_url(page_url, step=1):
+    # ".../1234.html" -> ".../1235.html" for step=1; None when the URL does not end in a chapter number
+    chapter_link_root, _, chapter_file = page_url.rpartition("/")
+    chapter_number, dot, extension = chapter_file.rpartition(".")
+    if not chapter_link_root or not dot or not chapter_number.isdigit():
+        return None
+    return chapter_link_root + "/" + str(int(chapter_number) + step) + "." + extension
 
-class ChapterContent(object):
-    def parse(self,sitename,soup_obj,chapterTitle):
-        method_name='parse_'+str(sitename)
-        self.soup = soup_obj
-        self.chapterTitle = chapterTitle
-        method=getattr(self,method_name,lambda :"invalid")
-        return method()
-    def parse_readnovelfull(self):
-        div = self.soup.select_one('div[id="chr-content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_royalroad(self):
-        div = self.soup.select_one('div[class="chapter-inner chapter-content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_scribblehub(self):
-        div = self.soup.select_one('div[class="chp_raw"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_boxnovel(self):
-        div = self.soup.select_one('div[class="entry-content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_readwebnovels(self):
-        div = self.soup.select_one('div[class="reading-content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_instadoses(self):
-        div = self.soup.select_one('div[class="reading-content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_novelfun(self):
-        div = self.soup.select_one('div[class="fontSize-2 css-p8fe3q-Content e1ktwp231"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_ranobes(self):
-        #print(str(self.soup))
-        div = self.soup.select_one('div[id="arrticle"]')
-        #print("Div: "+str(div))
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_tracan(self):
-        div = self.soup.select_one('div[class="entry-content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+str(div).split("Partager")[0].encode('utf-8')
-        return chapter_content
-    def parse_shuhaige(self):
-        div = self.soup.select_one('div[id="content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_tomatomtl(self):
-        article = self.soup.select_one('article[id="chapter_content"]')
-        for a in article.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+article.encode('utf-8')
-        return chapter_content
-    def parse_biquge(self):
-        div = self.soup.select_one('div[id="chaptercontent"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_xszj(self):
-        div = self.soup.select_one('div[id="booktxt"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_dxs(self):
-        div = self.soup.select_one('div[id="txt"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_tongrenquan(self):
-        div = self.soup.select_one('div[class="read_chapterDetail"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_novel543(self):
-        div = self.soup.select_one('div[class="content py-5"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_bixiange(self):
-        div = self.soup.select_one('div[class="content"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_quanben(self):
-        div = self.soup.select_one('div[class="articlebody"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-    def parse_69shubatw(self):
-        div = self.soup.select_one('div[id="nr1"]')
-        for a in div.select("a"):
-            a.decompose()
-        add_title = "<h1>"+self.chapterTitle+"</h1>"
-        chapter_content = add_title.encode('utf-8')+div.encode('utf-8')
-        return chapter_content
-
-class NextChapterLink(object):
-    def parse(self,sitename,soup_obj,website_url,current_page_url):
-        method_name='parse_'+str(sitename)
-        self.soup = soup_obj
-        self.website_url = website_url
-        self.current_page_url = current_page_url
-        method=getattr(self,method_name,lambda :"invalid")
-        return method()
-    def parse_readnovelfull(self):
-        anchor = self.soup.select_one('a[id="next_chap"]')
-        if anchor.get('href'):
-            page_url = self.website_url + str(anchor.get('href'))
-        else:
-            page_url = "invalid"
-        return page_url
-    def parse_royalroad(self):
-        page_url = "invalid"
-        anchor_all = self.soup.findAll("a", {"class": "btn btn-primary col-xs-12"})
-        for anchor in anchor_all:
-            if "Next" in str(anchor.text):
-                if anchor.get('href'):
-                    page_url = self.website_url + str(anchor.get('href'))
-                    break
-        return page_url
-    def parse_scribblehub(self):
-        page_url = "invalid"
-        anchor_all = self.soup.findAll("a", {"class": "btn-wi btn-next"})
-        for anchor in anchor_all:
-            if "Next" in str(anchor.text):
-                if anchor.get('href'):
-                    page_url = str(anchor.get('href'))
-                    break
-        return page_url
-    def parse_boxnovel(self):
-        page_url = "invalid"
-        anchor_all = self.soup.findAll("a", {"class": "btn next_page"})
-        for anchor in anchor_all:
-            if "Next" in str(anchor.text):
-                if anchor.get('href'):
-                    page_url = str(anchor.get('href'))
-                    break
-        return page_url
-    def parse_readwebnovels(self):
-        page_url = "invalid"
-        anchor_all = self.soup.findAll("a", {"class": "btn next_page"})
-        for anchor in anchor_all:
-            if "Next" in str(anchor.text):
-                if anchor.get('href'):
-                    page_url = str(anchor.get('href'))
-                    break
-        return page_url
-    def parse_instadoses(self):
-        page_url = "invalid"
-        anchor_all = self.soup.findAll("a", {"class": "btn next_page"})
-        for anchor in anchor_all:
-            if "Next" in str(anchor.text):
-                if anchor.get('href'):
-                    page_url = str(anchor.get('href'))
-                    break
-        return page_url
-    def parse_novelfun(self):
-        page_url = "invalid"
-        anchor_all = self.soup.findAll("a", {"class": "css-122d1rp"})
-        for anchor in anchor_all:
-            if "Next" in str(anchor.text):
-                if anchor.get('href'):
-                    page_url = self.website_url + str(anchor.get('href'))
+# "Next chapter" link detection without a translation round trip per anchor
+# (escaped because this file is declared latin-1): 下一章 下一節 下一节 下一页 下一頁 下章 下页 后一章 後一章
+NEXT_CHAPTER_PHRASES = ["\u4e0b\u4e00\u7ae0", "\u4e0b\u4e00\u7bc0", "\u4e0b\u4e00\u8282", "\u4e0b\u4e00\u9875", "\u4e0b\u4e00\u9801", "\u4e0b\u7ae0", "\u4e0b\u9875", "\u540e\u4e00\u7ae0", "\u5f8c\u4e00\u7ae0", "next"]
+NEXT_CHAPTER_PATTERN = re.compile("|".join(re.escape(phrase) for phrase in NEXT_CHAPTER_PHRASES), re.IGNORECASE)
+NEXT_CHAPTER_HINT_PATTERN = re.compile(r"next", re.IGNORECASE)
+
+class TranslationCache(object):
+    """
+    Persistent cache of GoogleTranslator results in a small SQLite file, keyed by
+    (source language, target language, text). Navigation texts repeat on every chapter,
+    so each one is translated only once, even across runs. Failed lookups are remembered
+    for the current run only.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+        self.memory = {}
+        self.hits = 0
+        self.misses = 0
+        # offline: never call the translator, unknown texts count as untranslatable
+        self.offline = False
+        self.lock = threading.Lock()
+
+    def lookup(self, key):
+        if key in self.memory:
+            return self.memory[key]
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS translations (source TEXT, target TEXT, text TEXT, "
+                                    "translated TEXT, PRIMARY KEY (source, target, text))")
+        row = self.connection.execute("SELECT translated FROM translations WHERE source=? AND target=? AND text=?", key).fetchone()
+        if row is not None:
+            self.memory[key] = row[0]
+            return row[0]
+        return None
+
+    def translate(self, text, source='zh-CN', target='en'):
+        key = (source, target, text)
+        with self.lock:
+            translated = self.lookup(key)
+            if translated is not None:
+                self.hits += 1
+                return translated
+            self.misses += 1
+            if self.offline:
+                self.memory[key] = ""
+                return ""
+        try:
+            from deep_translator import GoogleTranslator
+            translated = str(GoogleTranslator(source=source, target=target).translate(text))
+        except Exception as e:
+            print("Translation failed for '" + text + "': ", e)
+            with self.lock:
+                self.memory[key] = ""
+            return ""
+        with self.lock:
+            self.memory[key] = translated
+            self.connection.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", key + (translated,))
+            self.connection.commit()
+        return translated
+
+    def use_file(self, path):
+        # each run keeps its translations under its cache_dir; the file is opened on the next lookup
+        self.close()
+        with self.lock:
+            self.path = path
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+# where translations, chapter stores, the HTTP cache and covers are kept unless parser_inputs.json sets cache_dir
+DEFAULT_CACHE_DIR = "cache"
+
+TRANSLATION_CACHE = TranslationCache(os.path.join(DEFAULT_CACHE_DIR, "translation_cache.sqlite3"))
+
+def translate_to_english(text):
+    return TRANSLATION_CACHE.translate(text, 'zh-CN', 'en')
+
+def find_next_chapter_anchor(anchor_all):
+    # First anchor with an href whose text is a known "next chapter" phrase or whose rel/id/class says next.
+    # Only when none matches are the anchor texts translated, like the old per-anchor lookup did.
+    for anchor in anchor_all:
+        if not anchor.get('href'):
+            continue
+        hints = [" ".join(anchor.get('rel') or []), str(anchor.get('id') or ""), " ".join(anchor.get('class') or [])]
+        if NEXT_CHAPTER_PATTERN.search(str(anchor.text)) or any(NEXT_CHAPTER_HINT_PATTERN.search(hint) for hint in hints):
+            return anchor
+    for anchor in anchor_all:
+        to_translate = str(anchor.text).strip()
+        if anchor.get('href') and to_translate and "next" in translate_to_english(to_translate).lower():
+            return anchor
+    return None
+
+def compile_selector(selector):
+    # None stays None, so optional selectors can be tested with "if"
+    return soupsieve.compile(selector) if selector else None
+
+def href_allowed(href, rules):
+    # href rules of a site registry entry ("next" or "index")
+    if "href_not" in rules and href == rules["href_not"]:
+        return False
+    if "href_contains" in rules and rules["href_contains"] not in href:
+        return False
+    if "href_excludes" in rules and rules["href_excludes"] in href:
+        return False
+    if "href_slashes" in rules and href.count("/") != rules["href_slashes"]:
+        return False
+    return True
+
+# Leftmost compound of a CSS selector ("div[class='book'] h1" -> div[class='book']) when it is a plain
+# tag name with [attribute] / [attribute='value'] conditions followed by a descendant or child combinator
+LEFTMOST_COMPOUND = re.compile(r"\s*([a-zA-Z][\w-]*|\*)?((?:\[[^\]]*\])*)(?=\s*$|\s*>|\s+[^\s+~])")
+ATTRIBUTE_CONDITION = re.compile(r"""\[\s*([\w-]+)\s*(?:=\s*(['"])(.*?)\2)?\s*\]""")
+
+def leftmost_compound(selector):
+    # (tag name or None, {attribute: value, None for "present"}), None if the selector is not that simple
+    if "," in selector:
+        return None
+    match = LEFTMOST_COMPOUND.match(selector)
+    if match is None or not (match.group(1) or match.group(2)):
+        return None
+    conditions = {}
+    for condition in re.findall(r"\[[^\]]*\]", match.group(2)):
+        attribute = ATTRIBUTE_CONDITION.fullmatch(condition)
+        if attribute is None:
+            return None
+        conditions[attribute.group(1)] = attribute.group(3)
+    return (match.group(1) if match.group(1) != "*" else None), conditions
+
+class PageElementFilter(ElementFilter):
+    """
+    Keeps only the parts of a chapter page that a site's selectors can match: the <title> and every
+    element matching the leftmost compound of one of them, with its whole subtree (BeautifulSoup only
+    asks about elements outside the kept ones). Ads, comments and menus never become Tags.
+    """
+    def __init__(self, compounds):
+        super().__init__()
+        self.compounds = compounds
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        if name == "title":
+            return True
+        attrs = attrs or {}
+        for tag_name, conditions in self.compounds:
+            if tag_name is not None and tag_name != name:
+                continue
+            for attribute, value in conditions.items():
+                present = attrs.get(attribute)
+                if present is None:
                     break
-        return page_url
-    def parse_ranobes(self):
-        page_url = "invalid"
-        anchor = self.soup.select_one('a[id="next"]')
-        if anchor and anchor.get('href'):
-            if str(anchor.get('href')) != "./":
-                page_url = str(anchor.get('href'))
-        return page_url
-    def parse_tracan(self):
-        page_url = "invalid"
-        div = self.soup.select_one('div[class="entry-content"]')
-        anchor_all = div.select('a')
-        for anchor in anchor_all:
-            if "Next" in str(anchor.text):
-                if anchor.get('href'):
-                    page_url = str(anchor.get('href'))
+                if isinstance(present, list):
+                    present = " ".join(present)
+                if value is not None and " ".join(present.split()) != " ".join(value.split()):
                     break
-        return page_url
-    def parse_shuhaige(self):
-        page_url = "invalid"
-        anchor = self.soup.select_one('a[id="pager_next"]')
-        if anchor and anchor.get('href'):
-            if not "shu_" in str(anchor.get('href')):
-                page_url = self.website_url + str(anchor.get('href'))
-        return page_url
-    def parse_tomatomtl(self):
-        page_url = "invalid"
-        anchor = self.soup.select_one('a[id="next-chap2"]')
-        if anchor and anchor.get('href'):
-            if not "undefined" in str(anchor.get('href')):
-                page_url = self.website_url + str(anchor.get('href'))
-        print("Page URL: "+str(page_url))
-        return page_url
-    def parse_biquge(self):
-        page_url = "invalid"
-        anchor = self.soup.select_one('a[id="next_url"]')
-        if anchor and anchor.get('href'):
-            if str(anchor.get('href')).count("/") == 3:
-                page_url = self.website_url + str(anchor.get('href'))
-        return page_url
-    def parse_xszj(self):
-        #time.sleep(1)
-        page_url = "invalid"
-        anchor_next = self.soup.select('a[rel="next"]')
-        if(not anchor_next):
-            anchor_next = self.soup.select('a[rel="prev"]')[1]
+            else:
+                return True
+        return False
+
+class SiteRules(object):
+    """
+    One website of the site registry: how to read the chapter title, content and next chapter link.
+    The CSS selectors are compiled once here instead of on every page.
+    """
+    def __init__(self, name, spec):
+        self.name = name
+        self.title_spec = spec.get("title", {})
+        self.content_spec = spec["content"]
+        self.next_spec = spec["next"]
+        self.index_rules = spec.get("index", {})
+        self.numbered_urls = bool(spec.get("numbered_urls", False))
+        self.selenium = spec.get("selenium")
+        self.title_selector = compile_selector(self.title_spec.get("selector"))
+        self.content_selector = compile_selector(self.content_spec["selector"])
+        self.remove_selector = compile_selector(self.content_spec.get("remove", "a"))
+        self.next_scope = compile_selector(self.next_spec.get("scope"))
+        if(self.next_spec["strategy"] == "rel"):
+            self.rel_next = compile_selector('a[rel="next"]')
+            self.rel_prev = compile_selector('a[rel="prev"]')
+        elif(self.next_spec["strategy"] in ("anchor", "text", "phrases")):
+            self.next_selector = compile_selector(self.next_spec.get("selector", "a"))
         else:
-            anchor_next = self.soup.select('a[rel="next"]')[0]
-        if anchor_next.get('href') and "/b/" in str(anchor_next.get('href')):
-            page_url = self.website_url + str(anchor_next.get('href'))
-        return page_url
-    def parse_dxs(self):
-        page_url = "invalid"
-        anchor = self.soup.select_one('a[class="url_next"]')
-        if anchor and anchor.get('href'):
-            if ".html" in str(anchor.get('href')):
-                page_url = str(anchor.get('href'))
-        print("Page URL: "+str(page_url))
-        return page_url
-    def parse_tongrenquan(self):
-        page_url = "invalid"
-        #div = self.soup.select_one('div[class="pageNav"]')
-        anchor_all = self.soup.select('a') #div.select('a')
-        for anchor in anchor_all:
-            to_translate = str(anchor.text)
-            translated_text = GoogleTranslator(source='zh-CN', target='en').translate(to_translate)
-            if "next" in str(translated_text).lower():
-                if anchor.get('href'):
-                    page_url = self.website_url + str(anchor.get('href'))
-                    break
-        if page_url=="invalid":
-            chapter_link_root = self.current_page_url.rsplit("/",1)[0]
-            chapter_link_number = int(str(self.current_page_url.rsplit("/",1)[-1]).rsplit(".",1)[0]) + 1
-            page_url = chapter_link_root + "/" + str(chapter_link_number) + ".html"
-        if page_url==self.current_page_url:
-            return"invalid"
-        return page_url
-    def parse_novel543(self):
-        page_url = "invalid"
-        div = self.soup.select_one('div[class="warp my-5 foot-nav"]')
-        anchor_all = div.select('a')
-        #anchor_all = self.soup.select('a')
-        for anchor in anchor_all:
-            to_translate = str(anchor.text)
-            translated_text = GoogleTranslator(source='zh-CN', target='en').translate(to_translate)
-            if "next" in str(translated_text).lower():
-                if anchor.get('href'):
-                    page_url = self.website_url + str(anchor.get('href'))
-                    break
-        return page_url
-    def parse_bixiange(self):
-        page_url = "invalid"
-        div = self.soup.select_one('div[class="mPage"]')
-        anchor_all = div.select('a')
-        for anchor in anchor_all:
-            to_translate = str(anchor.text)
-            translated_text = GoogleTranslator(source='zh-CN', target='en').translate(to_translate)
-            if "next" in str(translated_text).lower():
-                if anchor.get('href'):
-                    page_url = self.website_url + str(anchor.get('href'))
-                    break
-        if page_url=="invalid":
-            chapter_link_root = self.current_page_url.rsplit("/",1)[0]
-            chapter_link_number = int(str(self.current_page_url.rsplit("/",1)[-1]).rsplit(".",1)[0]) + 1
-            page_url = chapter_link_root + "/" + str(chapter_link_number) + ".html"
-        if page_url==self.current_page_url:
-            return"invalid"
-        return page_url
-    def parse_quanben(self):
-        page_url = "invalid"
-        anchor_next = self.soup.select('a[rel="next"]')
-        if(not anchor_next):
-            anchor_next = self.soup.select('a[rel="prev"]')[1]
+            raise ValueError("Unknown next link strategy '" + str(self.next_spec["strategy"]) + "' for " + name)
+        self.page_filter = self.build_page_filter()
+
+    def build_page_filter(self):
+        # the elements that title(), content() and next_link() look in; None means parse the whole page
+        selectors = [self.title_spec.get("selector"), self.content_spec["selector"]]
+        if(self.next_spec.get("scope")):
+            selectors.append(self.next_spec["scope"])
+        elif(self.next_spec["strategy"] == "rel"):
+            selectors += ['a[rel="next"]', 'a[rel="prev"]']
         else:
-            anchor_next = self.soup.select('a[rel="next"]')[0]
-        if anchor_next.get('href') and "/n/" in str(anchor_next.get('href')):
-            page_url = self.website_url + str(anchor_next.get('href'))
-        return page_url
-    def parse_69shubatw(self):
+            selectors.append(self.next_spec.get("selector", "a"))
+        compounds = [leftmost_compound(selector) for selector in selectors if selector]
+        if not PARTIAL_PARSE or None in compounds:
+            return None
+        return PageElementFilter(compounds)
+
+    def parse_page(self, page_content):
+        return BeautifulSoup(page_content, "lxml", parse_only=self.page_filter)
+
+    def title(self, soup):
+        chapterTitle = None
+        heading = self.title_selector.select_one(soup) if self.title_selector else None
+        if heading is not None:
+            attribute = self.title_spec.get("attribute")
+            chapterTitle = heading.get(attribute) if attribute else heading.text
+        if not chapterTitle and self.title_spec.get("page_title", True) and soup.title and soup.title.string:
+            chapterTitle = soup.title.string
+        if not chapterTitle:
+            chapterTitle = "invalid"
+        return str(chapterTitle)
+
+    def content(self, soup, chapterTitle):
+        div = self.content_selector.select_one(soup)
+        if div is None:
+            raise ValueError("No chapter content found (" + self.content_spec["selector"] + ")")
+        if self.remove_selector:
+            for element in self.remove_selector.select(div):
+                element.decompose()
+        body = str(div)
+        if "cut_at" in self.content_spec:
+            body = body.split(self.content_spec["cut_at"])[0]
+        add_title = "<h1>"+chapterTitle+"</h1>"
+        return add_title.encode('utf-8')+body.encode('utf-8')
+
+    def next_anchors(self, soup):
+        # candidate anchors in order, the first one with an href is the next chapter link
+        scope = self.next_scope.select_one(soup) if self.next_scope else soup
+        if scope is None:
+            return []
+        strategy = self.next_spec["strategy"]
+        if(strategy == "anchor"):
+            anchor = self.next_selector.select_one(scope)
+            return [anchor] if anchor is not None else []
+        if(strategy == "text"):
+            return [anchor for anchor in self.next_selector.select(scope) if self.next_spec["text"] in str(anchor.text)]
+        if(strategy == "rel"):
+            # no rel="next" on the last pages, the second rel="prev" is the next chapter there
+            return self.rel_next.select(scope)[:1] or self.rel_prev.select(scope)[1:2]
+        anchor = find_next_chapter_anchor(self.next_selector.select(scope))
+        return [anchor] if anchor is not None else []
+
+    def next_link(self, soup, website_url, current_page_url):
         page_url = "invalid"
-        anchor = self.soup.select_one('a[id="pb_next"]')
-        if anchor and anchor.get('href'):
-            if "read" in str(anchor.get('href')):
-                page_url = self.website_url + str(anchor.get('href'))
+        for anchor in self.next_anchors(soup):
+            if anchor.get('href'):
+                href = str(anchor.get('href'))
+                if href_allowed(href, self.next_spec):
+                    page_url = (website_url if self.next_spec.get("relative") else "") + href
+                break
+        if self.numbered_urls:
+            if page_url == "invalid":
+                page_url = next_numbered_chapter_url(current_page_url) or "invalid"
+            if page_url == current_page_url:
+                return "invalid"
         return page_url
-    
 
-def generate_cover(title, author=None, output_path='cover.jpg'):
+class SiteRegistry(object):
+    """
+    The supported websites, read once from site_registry.json (see its _comment keys).
+    Adding a site only needs a new entry there.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "r", encoding='utf-8') as f:
+            specs = json.load(f)
+        self.sites = {}
+        for name, spec in specs.items():
+            if not name.startswith("_comment"):
+                self.sites[name] = SiteRules(name, spec)
+
+    def __contains__(self, name):
+        return name in self.sites
+
+    def get(self, name):
+        return self.sites[name]
+
+SITE_REGISTRY = SiteRegistry(os.path.join(os.path.dirname(os.path.abspath(__file__)), "site_registry.json"))
+
+class ChapterIndex(object):
+    """
+    Reads the novel's catalog (table of contents) page and returns every chapter URL in reading order:
+    links in the same folder as the start chapter that pass the site's "index" href rules.
+    """
+    def parse(self,site,soup_obj,index_url,start_page_url):
+        self.soup = soup_obj
+        self.index_url = index_url
+        self.start_page_url = start_page_url
+        return self.chapter_links(lambda url, href: self.in_chapter_folder(url) and href_allowed(href, site.index_rules))
+    def chapter_links(self,keep):
+        # Absolute URLs of the links accepted by keep(url, href). Catalogs often list the latest
+        # chapters first and then the full list, so a repeated link keeps its last position.
+        positions = {}
+        for anchor in self.soup.select('a[href]'):
+            href = str(anchor.get('href'))
+            url = urljoin(self.index_url, href)
+            if keep(url, href):
+                positions.pop(url, None)
+                positions[url] = True
+        return list(positions)
+    def in_chapter_folder(self,url):
+        chapter_folder = self.start_page_url.rsplit("/",1)[0] + "/"
+        return url.startswith(chapter_folder) and url != chapter_folder and url != self.index_url
+
+class ChapterPrefetcher(object):
+    """
+    Fetches the predicted next chapters (see next_numbered_chapter_url) in background threads
+    while the current one is being parsed. A prefetched page is only used when the parsed next
+    link really points at it; wrong guesses are dropped and that page is fetched normally.
+    """
+    def __init__(self, fetch_page, window=8):
+        self.fetch_page = fetch_page
+        self.window = window
+        self.executor = ThreadPoolExecutor(max_workers=window)
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, page_url):
+        future = self.pending.pop(page_url, None)
+        # keep the window full before waiting on this page
+        self.schedule(page_url)
+        if future is not None:
+            try:
+                content = future.result()
+                self.hits += 1
+                return content
+            except Exception as e:
+                print("Prefetch of " + page_url + " failed, fetching again: ", e)
+        self.misses += 1
+        return self.fetch_page(page_url)
+
+    def schedule(self, page_url):
+        wanted = []
+        url = page_url
+        for _ in range(self.window):
+            url = next_numbered_chapter_url(url)
+            if url is None:
+                break
+            wanted.append(url)
+        # drop guesses that are no longer ahead of the current chapter
+        for url in list(self.pending):
+            if url not in wanted:
+                self.pending.pop(url).cancel()
+        for url in wanted:
+            if url not in self.pending:
+                self.pending[url] = self.executor.submit(self.fetch_page, url)
+
+    def close(self):
+        # queued guesses are cancelled, the ones already downloading are waited for:
+        # they use the browsers and caches that are closed right after this
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
+
+class ChapterDownloader(object):
+    """
+    Downloads a list of chapter URLs with a bounded thread pool, at most per_host_limit requests
+    to the same host at a time, and yields (url, page_content) in list order. Only a window of
+    pages ahead of the one being consumed is in flight. page_content is None when the download failed.
+    """
+    def __init__(self, fetch_page, workers=8, per_host_limit=4):
+        self.fetch_page = fetch_page
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
+    def fetch(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            slots = self.host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host_limit))
+        with slots:
+            return self.fetch_page(url)
+
+    def iter_pages(self, chapter_urls):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            remaining = iter(chapter_urls)
+            for url in remaining:
+                pending.append((url, executor.submit(self.fetch, url)))
+                if len(pending) >= self.workers * 4:
+                    break
+            while pending:
+                url, future = pending.popleft()
+                next_url = next(remaining, None)
+                if next_url is not None:
+                    pending.append((next_url, executor.submit(self.fetch, next_url)))
+                try:
+                    page_content = future.result()
+                except Exception as e:
+                    print("Could not download " + url + ". Exception: ", e)
+                    page_content = None
+                yield url, page_content
+
+# Responses worth another try: rate limited, server errors and Cloudflare's own 52x errors
+RETRY_STATUSES = {429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+# cloudscraper errors for challenges it could not solve this time (matched by name, cloudscraper is imported lazily)
+RETRY_CLOUDFLARE_ERRORS = {"CloudflareChallengeError", "CloudflareIUAMError", "CloudflareLoopProtection", "CloudflareSolveError"}
+
+class FetchFailed(Exception):
+    pass
+
+class FetchScheduler(object):
+    """
+    Paces requests with a token bucket per host (rate requests per second, bursts of up to burst)
+    and retries transient failures - connection errors, RETRY_STATUSES and Cloudflare challenges -
+    with jittered exponential backoff, honouring Retry-After. A failure makes every thread wait
+    before its next request to that host, not just the one that failed. Retries are paid from a
+    failure budget shared by the whole run; once it is spent, failures are raised straight away.
+    """
+    def __init__(self, rate=4.0, burst=4, retries=4, backoff=1.0, max_backoff=60.0, failure_budget=30, timeout=30):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_budget = failure_budget
+        self.timeout = timeout
+        self.requests = 0
+        self.retried = 0
+        # host -> (tokens, time of the last refill) and host -> no requests before this time
+        self.buckets = {}
+        self.blocked_until = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        # blocks until the host has a token left (rate <= 0 disables pacing, not backoff)
+        host = urlparse(url).netloc
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.blocked_until.get(host, 0) - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        self.requests += 1
+                        return
+                    tokens, updated = self.buckets.get(host, (self.burst, now))
+                    tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                    if tokens >= 1:
+                        self.buckets[host] = (tokens - 1, now)
+                        self.requests += 1
+                        return
+                    self.buckets[host] = (tokens, now)
+                    wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+    def retry_reason(self, response):
+        if response.status_code in RETRY_STATUSES:
+            return "HTTP " + str(response.status_code)
+        if response.status_code == 403 and "cloudflare" in response.headers.get('Server', '').lower():
+            return "Cloudflare challenge (HTTP 403)"
+        return None
+
+    def retry_delay(self, attempt, response):
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+        # "full jitter": anywhere between 0 and the exponential step, so threads do not retry in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get(self, session, url, headers=None):
+        # session is anything with requests' get(url, headers=..., timeout=...), e.g. a cloudscraper scraper
+        host = urlparse(url).netloc
+        for attempt in range(self.retries + 1):
+            self.acquire(url)
+            response = None
+            try:
+                response = session.get(url, headers=headers or {}, timeout=self.timeout)
+                reason = self.retry_reason(response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                reason = type(e).__name__
+            except Exception as e:
+                if type(e).__name__ not in RETRY_CLOUDFLARE_ERRORS:
+                    raise
+                reason = type(e).__name__
+            if reason is None:
+                return response
+            with self.lock:
+                if attempt == self.retries or self.failure_budget <= 0:
+                    if self.failure_budget <= 0:
+                        reason += ", failure budget used up"
+                    raise FetchFailed("Could not fetch " + url + " (" + reason + ")")
+                self.failure_budget -= 1
+                self.retried += 1
+                delay = self.retry_delay(attempt, response)
+                self.blocked_until[host] = max(self.blocked_until.get(host, 0), time.monotonic() + delay)
+            print("Retrying " + url + " in " + str(round(delay, 1)) + "s (" + reason + ")")
+
+class PacedSession(object):
+    """
+    Wraps a requests-like session so that its get() goes through a FetchScheduler, e.g. for HttpCache.get.
+    """
+    def __init__(self, scheduler, session):
+        self.scheduler = scheduler
+        self.session = session
+
+    def get(self, url, headers=None):
+        return self.scheduler.get(self.session, url, headers)
+
+class ChapterStore(object):
+    """
+    On-disk store of parsed chapters in SQLite, one row per chapter: number, URL, title,
+    content, next URL and fetch time. An interrupted scrape resumes after the last stored
+    chapter, and the EPUB can be rebuilt from the store without downloading anything.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS chapters (number INTEGER PRIMARY KEY, url TEXT, title TEXT, "
+                                "content BLOB, next_url TEXT, fetched_at REAL)")
+        # pages that were fetched but not added to the book (duplicates, loops) and why
+        self.connection.execute("CREATE TABLE IF NOT EXISTS skipped (url TEXT PRIMARY KEY, reason TEXT, skipped_at REAL)")
+
+    def chapters(self):
+        # a cursor, so stored chapters are read one at a time
+        return self.connection.execute("SELECT number, url, title, content, next_url FROM chapters ORDER BY number")
+
+    def last(self):
+        return self.connection.execute("SELECT number, url, next_url FROM chapters ORDER BY number DESC LIMIT 1").fetchone()
+
+    def save(self, number, url, title, content, next_url):
+        # committed per chapter, so nothing parsed is lost when the run stops
+        self.connection.execute("INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?)",
+                                (number, url, title, content, next_url, time.time()))
+        self.connection.commit()
+
+    def end(self):
+        # the book ends after the last stored chapter, a rerun does not follow its next link again
+        self.connection.execute("UPDATE chapters SET next_url = 'invalid' WHERE number = (SELECT MAX(number) FROM chapters)")
+        self.connection.commit()
+
+    def skip(self, url, reason):
+        self.connection.execute("INSERT OR REPLACE INTO skipped VALUES (?, ?, ?)", (url, reason, time.time()))
+        self.connection.commit()
+
+    def skipped(self):
+        return self.connection.execute("SELECT url, reason FROM skipped ORDER BY skipped_at").fetchall()
+
+    def close(self):
+        self.connection.close()
+
+def chapter_text(chapter_content):
+    # text of a parsed chapter without the <h1> title ChapterContent puts in front, whitespace collapsed
+    html = chapter_content.decode('utf-8', 'replace').split("</h1>", 1)[-1]
+    return " ".join(re.sub(r"<[^>]*>", " ", html).split())
+
+def simhash(text, shingle=3):
+    # 64-bit simhash over overlapping character shingles (works for Chinese, which has no spaces)
+    counts = {}
+    for start in range(max(1, len(text) - shingle + 1)):
+        piece = text[start:start + shingle]
+        counts[piece] = counts.get(piece, 0) + 1
+    # tally the shingle hashes byte by byte, then a bit is set when most of the weight has it set:
+    # 8 additions per shingle instead of 64
+    tallies = [[0] * 256 for _ in range(8)]
+    for piece, count in counts.items():
+        for position, byte in enumerate(hashlib.blake2b(piece.encode('utf-8'), digest_size=8).digest()):
+            tallies[position][byte] += count
+    total = sum(counts.values())
+    fingerprint = 0
+    for position, tally in enumerate(tallies):
+        for bit in range(8):
+            if 2 * sum(tally[byte] for byte in range(256) if byte >> bit & 1) > total:
+                fingerprint |= 1 << (8 * position + bit)
+    return fingerprint
+
+class ChapterFingerprints(object):
+    """
+    Recognises chapters seen before by URL, by an exact hash of their text and by a simhash of it,
+    so a chapter served again under another URL or a near-identical "please reload" page is caught.
+    The 64-bit simhash is split into max_distance + 1 bands: two fingerprints at most max_distance
+    bits apart share at least one band, so a lookup only compares against the chapters in those
+    buckets, not all of them. The default 3 gives four 16-bit bands; larger distances give more,
+    narrower bands and so more chapters to compare against.
+    Chapters with less than min_chars characters of text (image-only chapters, bodies that failed
+    to parse) are only recognised by URL: their near-empty texts would all look the same.
+    """
+    def __init__(self, max_distance=3, min_chars=200):
+        if(not 0 <= max_distance < 64):
+            raise ValueError("duplicate_distance must be between 0 and 63, not " + str(max_distance))
+        self.max_distance = max_distance
+        self.min_chars = min_chars
+        # bit offsets of the bands, as equal in width as 64 bits allow
+        self.band_edges = [64 * band // (max_distance + 1) for band in range(max_distance + 2)]
+        self.urls = {}
+        self.hashes = {}
+        self.bands = {}
+
+    def fingerprint(self, text):
+        # None when the text is too short to tell chapters apart
+        if(len(text) < self.min_chars):
+            return None
+        # numbers are masked, error pages often differ only in the chapter number they mention
+        text = re.sub(r"\d+", "0", text)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest(), simhash(text)
+
+    def band_keys(self, simhash_value):
+        return [(band, simhash_value >> low & ((1 << (high - low)) - 1))
+                for band, (low, high) in enumerate(zip(self.band_edges, self.band_edges[1:]))]
+
+    def duplicate_of(self, url, fingerprint):
+        # why the chapter repeats an earlier one, None if it is new (or is that chapter again, same URL)
+        if(fingerprint is None):
+            return None
+        digest, simhash_value = fingerprint
+        if digest in self.hashes and self.urls.get(url) != self.hashes[digest]:
+            return "same text as chapter " + str(self.hashes[digest])
+        for key in self.band_keys(simhash_value):
+            for other, number in self.bands.get(key, ()):
+                distance = bin(simhash_value ^ other).count("1")
+                if distance <= self.max_distance and self.urls.get(url) != number:
+                    return "nearly the same text as chapter " + str(number) + " (simhash distance " + str(distance) + ")"
+        return None
+
+    def add(self, number, url, fingerprint):
+        if self.urls.get(url) == number:
+            return
+        # the URL is remembered even without a fingerprint, a link back to it is still a loop
+        self.urls[url] = number
+        if(fingerprint is None):
+            return
+        digest, simhash_value = fingerprint
+        self.hashes.setdefault(digest, number)
+        for key in self.band_keys(simhash_value):
+            self.bands.setdefault(key, []).append((simhash_value, number))
+
+class SeleniumReadiness(object):
+    """
+    Waits until the chapter content element is present, the document has loaded and the
+    content's text length has stopped changing for `settle` seconds, instead of fixed sleeps.
+    The element gets the full max_timeout to appear (never less than the old fixed 10s); only the
+    settle polling after it adapts to the site: a few times the median of recent waits, within bounds.
+    """
+    def __init__(self, poll=0.2, min_timeout=5, max_timeout=30):
+        self.poll = poll
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.waits = []
+
+    def timeout(self):
+        recent = sorted(self.waits[-20:])
+        if not recent:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, 3 * recent[len(recent) // 2]))
+
+    def wait(self, driver, by, name, predicate=None, settle=0.5):
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import StaleElementReferenceException
+        start = time.perf_counter()
+        timeout = self.timeout()
+        # a slow page after a run of fast ones must not end the book, so no adaptive value here
+        WebDriverWait(driver, self.max_timeout).until(EC.presence_of_element_located((by, name)))
+        element = driver.find_element(by, name)
+        last_length = -1
+        stable_since = time.perf_counter()
+        settle_start = stable_since
+        while time.perf_counter() - settle_start < timeout:
+            try:
+                length = driver.execute_script("return arguments[0].textContent.length;", element)
+            except StaleElementReferenceException:
+                # content was re-rendered, follow the new element
+                element = driver.find_element(by, name)
+                length = -1
+            ready = driver.execute_script("return document.readyState;") == "complete"
+            if ready and predicate:
+                ready = bool(driver.execute_script(predicate))
+            now = time.perf_counter()
+            if length != last_length or not ready:
+                last_length = length
+                stable_since = now
+            elif length > 0 and now - stable_since >= settle:
+                break
+            time.sleep(self.poll)
+        waited = time.perf_counter() - start
+        self.waits.append(waited)
+        return element, waited
+
+def create_selenium_driver(browser_choice):
+    from selenium import webdriver
+    if(browser_choice == "firefox"):
+        from selenium.webdriver.firefox.options import Options as FirefoxOptions
+        # Path to your EXISTING Firefox profile (already logged in)
+        firefox_profile_path = "C:\\Users\\vinay\\AppData\\Roaming\\Mozilla\\Firefox\\Profiles\\spdu5de0.default-release"
+        options = FirefoxOptions()
+        # Load existing logged-in Firefox profile
+        options.add_argument("-profile")
+        options.add_argument(firefox_profile_path)
+        # Optional — REMOVE if login breaks
+        # options.add_argument("--headless")
+        return webdriver.Firefox(options=options)
+    # Set up Chrome options for headless browsing
+    # For Edge use: from selenium.webdriver.edge.options import Options as EdgeOptions,
+    # chrome_options = EdgeOptions() and driver = webdriver.Edge(options=chrome_options) at the end...
+    from selenium.webdriver.chrome.options import Options
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')  # Run without opening browser window
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument("--log-level=1")
+    chrome_options.add_argument('--enable-unsafe-swiftshader')
+    # Initialize the WebDriver (assuming Chrome)
+    return webdriver.Chrome(options=chrome_options)
+
+def render_chapter_page(driver, readiness, site, page_url):
+    from selenium.webdriver.common.by import By
+    driver.get(page_url)
+
+    # Wait for the chapter content to appear and stop changing for the site's settle time
+    if("id" in site.selenium):
+        by, id_name = By.ID, site.selenium["id"]
+    else:
+        by, id_name = By.CLASS_NAME, site.selenium["class"]
+    content_div, waited = readiness.wait(driver, by, id_name, site.selenium.get("ready_script"),
+                                         float(site.selenium.get("settle", 0.5)))
+    print("Content ready after " + str(round(waited, 2)) + "s")
+    return driver.page_source #driver.find_elements(By.TAG_NAME, 'html')
+
+class SeleniumDriverPool(object):
+    """
+    A fixed number of browser drivers shared by the fetching threads, started on first use.
+    A driver is reused across pages and replaced after max_pages pages (browsers keep growing
+    in memory) or when it crashes, in which case the page is tried once more on a new driver.
+    """
+    def __init__(self, browser_choice, site, size=1, max_pages=100):
+        self.browser_choice = browser_choice
+        self.site = site
+        self.size = size
+        self.max_pages = max_pages
+        self.readiness = SeleniumReadiness()
+        # live drivers and the pages each one rendered
+        self.page_counts = {}
+        self.restarts = 0
+        self.closed = False
+        self.drivers = queue.Queue()
+        for _ in range(size):
+            self.drivers.put(None)
+
+    def quit_driver(self, driver):
+        self.page_counts.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def fetch(self, page_url):
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        driver = self.drivers.get()
+        try:
+            for attempt in range(2):
+                if driver is None:
+                    driver = create_selenium_driver(self.browser_choice)
+                    self.page_counts[driver] = 0
+                try:
+                    page_source = render_chapter_page(driver, self.readiness, self.site, page_url)
+                except TimeoutException:
+                    # content never showed up: the page is the problem, not the browser
+                    raise
+                except WebDriverException as e:
+                    if attempt:
+                        raise
+                    print("Browser failed on " + page_url + ", restarting it: ", e)
+                    self.quit_driver(driver)
+                    self.restarts += 1
+                    driver = None
+                    continue
+                self.page_counts[driver] += 1
+                if self.page_counts[driver] >= self.max_pages:
+                    self.quit_driver(driver)
+                    self.restarts += 1
+                    driver = None
+                return page_source
+        finally:
+            if self.closed and driver is not None:
+                self.quit_driver(driver)
+                driver = None
+            self.drivers.put(driver)
+
+    def close(self):
+        # also quits drivers still busy with prefetches nobody will use
+        self.closed = True
+        for driver in list(self.page_counts):
+            self.quit_driver(driver)
+
+class NotInHttpCache(Exception):
+    pass
+
+class HttpCache(object):
+    """
+    On-disk HTTP response cache. Bodies are stored content-addressed (objects/<sha256>) and an
+    SQLite index maps each URL to its body, status, ETag and Last-Modified. Cached URLs are
+    re-validated with If-None-Match / If-Modified-Since, so an unchanged page costs a 304 and is
+    read from disk. offline=True never touches the network and raises NotInHttpCache on a miss.
+    Only 2xx responses are cached: error pages are returned as they are but never stored (or served
+    offline), and an error entry left by an older version is dropped when it is looked up.
+    """
+    def __init__(self, directory, offline=False):
+        self.directory = directory
+        self.offline = offline
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, sha256 TEXT, status INTEGER, "
+                                "etag TEXT, last_modified TEXT, fetched_at REAL)")
+
+    def lookup(self, url):
+        with self.lock:
+            entry = self.connection.execute("SELECT sha256, status, etag, last_modified FROM responses WHERE url=?", (url,)).fetchone()
+            if entry is not None and not 200 <= entry[1] < 300:
+                self.connection.execute("DELETE FROM responses WHERE url=?", (url,))
+                self.connection.commit()
+                entry = None
+        return entry
+
+    def read_body(self, sha256):
+        with open(os.path.join(self.directory, "objects", sha256), 'rb') as f:
+            return f.read()
+
+    def put(self, url, content, status=200, etag=None, last_modified=None):
+        sha256 = hashlib.sha256(content).hexdigest()
+        object_path = os.path.join(self.directory, "objects", sha256)
+        if not os.path.exists(object_path):
+            tmp_path = object_path + "." + str(threading.get_ident()) + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, object_path)
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                                    (url, sha256, status, etag, last_modified, time.time()))
+            self.connection.commit()
+
+    def get(self, session, url):
+        # session is anything with requests' get(url, headers=...), e.g. a cloudscraper scraper
+        entry = self.lookup(url)
+        if entry is not None and not os.path.exists(os.path.join(self.directory, "objects", entry[0])):
+            entry = None
+        if self.offline:
+            if entry is None:
+                raise NotInHttpCache("Not in the HTTP cache (offline): " + url)
+            self.hits += 1
+            return self.read_body(entry[0])
+        headers = {}
+        if entry is not None:
+            if entry[2]:
+                headers['If-None-Match'] = entry[2]
+            if entry[3]:
+                headers['If-Modified-Since'] = entry[3]
+        response = session.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            return self.read_body(entry[0])
+        self.misses += 1
+        content = response.content
+        if 200 <= response.status_code < 300:
+            self.put(url, content, response.status_code, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return content
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+class StreamingEpubWriter(epub.EpubWriter):
+    """
+    Writes the EPUB while the book is being scraped: each chapter's XHTML is added to the zip
+    as soon as it is parsed and its bytes are dropped, so memory stays flat whatever the chapter
+    count. finish() puts the chapters in the table of contents and spine by number, writes the
+    OPF, NCX, nav and the remaining items (cover, CSS) and moves <name>.part to <name>.
+    The _write_* methods it relies on are private to ebooklib (pinned in requirements.txt), so
+    finish() reads the zip back (check) before it replaces an existing book.
+    """
+    def __init__(self, name, book, options=None):
+        super().__init__(name, book, options)
+        self.part_name = name + ".part"
+        self.out = zipfile.ZipFile(self.part_name, "w", zipfile.ZIP_DEFLATED, compresslevel=self.options["compresslevel"])
+        self.out.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        self._write_container()
+        self.chapters = {}
+
+    def add_chapter(self, number, chapterTitle, chapter_content):
+        if number in self.chapters:
+            return
+        # Creates a chapter
+        c1 = epub.EpubHtml(title=chapterTitle, file_name='chap_'+str(number)+'.xhtml', lang='hr')
+        c1.content = chapter_content
+        self.book.add_item(c1)
+        self.out.writestr(self.book.FOLDER_NAME + "/" + c1.file_name, c1.get_content())
+        c1.content = b""
+        self.chapters[number] = c1
+
+    def _write_items(self):
+        # chapters are in the zip already
+        all_items = self.book.items
+        streamed = set(self.chapters.values())
+        self.book.items = [item for item in all_items if item not in streamed]
+        try:
+            super()._write_items()
+        finally:
+            self.book.items = all_items
+
+    def finish(self):
+        for number in sorted(self.chapters):
+            # Add to table of contents
+            self.book.toc.append(self.chapters[number])
+            # Add to book ordering
+            self.book.spine.append(self.chapters[number])
+        self._write_opf()
+        self._write_items()
+        self.out.close()
+        self.check(self.part_name)
+        os.replace(self.part_name, self.file_name)
+
+    def check(self, path):
+        # every manifest item must be in the zip and the spine must list the chapters by number
+        import xml.etree.ElementTree as ElementTree
+        opf_ns = "{http://www.idpf.org/2007/opf}"
+        with zipfile.ZipFile(path) as z:
+            names = set(z.namelist())
+            container = ElementTree.fromstring(z.read("META-INF/container.xml"))
+            opf_path = container.find(".//{urn:oasis:names:tc:opendocument:xmlns:container}rootfile").get("full-path")
+            opf = ElementTree.fromstring(z.read(opf_path))
+        folder = opf_path.rpartition("/")[0]
+        manifest = {item.get("id"): item.get("href") for item in opf.iter(opf_ns + "item")}
+        missing = [href for href in manifest.values() if (folder + "/" + href if folder else href) not in names]
+        chapter_files = [self.chapters[number].file_name for number in sorted(self.chapters)]
+        chapter_set = set(chapter_files)
+        spine = [manifest.get(ref.get("idref")) for ref in opf.iter(opf_ns + "itemref")]
+        problems = []
+        if missing:
+            problems.append("missing " + ", ".join(missing[:5]))
+        if [href for href in spine if href in chapter_set] != chapter_files:
+            problems.append("chapters missing or out of order in the spine")
+        if problems:
+            raise ValueError("The EPUB written to " + path + " is broken (" + "; ".join(problems)
+                             + "). Is the installed ebooklib the version pinned in requirements.txt?")
+
+def generate_cover(title, author=None):
+    # renders a plain title/author cover and returns it as a PIL image
+    from PIL import Image, ImageDraw, ImageFont
+    import textwrap
+
     # Image size (standard 6x9 inches at 300 DPI)
     width, height = 1800, 2700
     background_color = (0, 0, 0)      # Black
@@ -497,20 +1030,107 @@ def generate_cover(title, author=None, output_path='cover.jpg'):
         author_y = title_y + title_height + 100
         draw.text((author_x, author_y), author_text, font=author_font, fill=author_color)
 
-    # Save the image
-    img.save(output_path)
-    print(f"Cover saved to {output_path}")
+    return img
+
+def bounded_jpeg(data=None, image=None, max_width=1600, max_height=2400, quality=85, max_bytes=500 * 1024):
+    """
+    Returns the cover as JPEG bytes no larger than max_width x max_height, lowering the quality
+    (down to 40), then the size, until it fits in max_bytes. A JPEG already within bounds is kept as is.
+    Takes the downloaded bytes (data) or a PIL image.
+    """
+    from PIL import Image
+    if image is None:
+        image = Image.open(io.BytesIO(data))
+        if(image.format == 'JPEG' and image.mode == 'RGB' and image.width <= max_width
+           and image.height <= max_height and len(data) <= max_bytes):
+            return data
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        # transparent PNG/WebP covers go on white instead of JPEG's black
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    # only ever shrinks, keeping the aspect ratio
+    image.thumbnail((max_width, max_height), Image.LANCZOS)
+    while True:
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+        if out.tell() <= max_bytes or image.width <= 200:
+            return out.getvalue()
+        if quality > 40:
+            quality -= 10
+        else:
+            image = image.resize((image.width * 3 // 4, image.height * 3 // 4), Image.LANCZOS)
+
+class CoverCache(object):
+    """
+    Covers ready for the EPUB (see bounded_jpeg), kept on disk under a key made of the image URL,
+    or the title and author of a generated cover, and the size bounds. Regenerating a book reuses
+    its cover instead of downloading or rendering it again.
+    """
+    def __init__(self, directory, max_width=1600, max_height=2400, quality=85, max_bytes=500 * 1024):
+        self.directory = directory
+        self.bounds = dict(max_width=max_width, max_height=max_height, quality=quality, max_bytes=max_bytes)
+        self.hits = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def cached(self, key, make_cover):
+        key = json.dumps([key, sorted(self.bounds.items())], ensure_ascii=False)
+        path = os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + ".jpg")
+        if os.path.exists(path):
+            self.hits += 1
+            with open(path, 'rb') as f:
+                return f.read()
+        cover = make_cover()
+        tmp_path = path + "." + str(threading.get_ident()) + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(cover)
+        os.replace(tmp_path, path)
+        return cover
+
+    def from_url(self, url, download):
+        # download() returns the image bytes, it is only called on a cache miss
+        return self.cached(["url", url], lambda: bounded_jpeg(download(), **self.bounds))
+
+    def generated(self, title, author):
+        return self.cached(["generated", title, author], lambda: bounded_jpeg(image=generate_cover(title, author), **self.bounds))
 
 class EbookCreator(object):
-    def __init__(self, input_file="parser_inputs.json"):
+    def __init__(self, input_file="parser_inputs.json", offline=False):
         super().__init__()
         self.input_json = json.load(open(input_file,"r", encoding='utf-8'))
+        self.offline = offline or str(self.input_json.get("offline", "false")) == "true"
 
     def start_parsing(self):
 
-        # Get the text at the set URL
-        #scraper = cfscrape.create_scraper()
-        scraper = cloudscraper.create_scraper()
+        website_name = str(self.input_json["website_name"])
+        if(website_name not in SITE_REGISTRY):
+            print("Unknown website_name '" + website_name + "', supported: " + ", ".join(sorted(SITE_REGISTRY.sites)) + ".")
+            return
+        site = SITE_REGISTRY.get(website_name)
+
+        # Everything kept between runs (translations, chapter store, HTTP cache, covers) goes under cache_dir
+        cache_dir = str(self.input_json.get("cache_dir", DEFAULT_CACHE_DIR))
+        os.makedirs(cache_dir, exist_ok=True)
+        TRANSLATION_CACHE.use_file(os.path.join(cache_dir, "translation_cache.sqlite3"))
+
+        # HTTP cache: pages are kept on disk and only re-validated; offline runs read nothing but the cache
+        offline = self.offline
+        http_cache = None
+        if(offline or str(self.input_json.get("http_cache", "false")) == "true"):
+            http_cache = HttpCache(os.path.join(cache_dir, str(self.input_json.get("http_cache_dir", "http_cache"))), offline)
+            TRANSLATION_CACHE.offline = offline
+            if(offline):
+                print("Offline: pages are read from the HTTP cache only.")
+
+        # Every request is paced per host and transient failures are retried with backoff
+        scheduler = FetchScheduler(float(self.input_json.get("requests_per_second", 4)),
+                                   int(self.input_json.get("request_burst", 4)),
+                                   int(self.input_json.get("max_retries", 4)),
+                                   float(self.input_json.get("retry_backoff", 1.0)),
+                                   failure_budget=int(self.input_json.get("failure_budget", 30)))
 
         # Create the epub file
         book = epub.EpubBook()
@@ -523,27 +1143,32 @@ class EbookCreator(object):
         if(not self.input_json["author"] == ""):
             author = str(self.input_json["author"])
 
-        # Set cover image if available - JPEG only
-        cover_image_name = "cover.jpg"
-        add_image = True
-        image_url = self.input_json["novel_cover_image"]
-        if(image_url == ""):
-            add_image = False
-        if(add_image):
-            response_image = requests.get(image_url).content
-            f = open(cover_image_name,'wb')
-            f.write(response_image)
-            f.close()
-        else:
-            # Cover image not specified, so I will create one
-            add_image = True
-            generate_cover(title, author, cover_image_name)
-        
+        # Set cover image if available, re-encoded to a bounded JPEG and cached across runs
+        covers = CoverCache(os.path.join(cache_dir, str(self.input_json.get("cover_cache_dir", "cover_cache"))),
+                            int(self.input_json.get("cover_max_width", 1600)),
+                            int(self.input_json.get("cover_max_height", 2400)),
+                            int(self.input_json.get("cover_quality", 85)),
+                            int(self.input_json.get("cover_max_kb", 500)) * 1024)
+        def download_cover():
+            if(http_cache):
+                return http_cache.get(PacedSession(scheduler, requests), image_url)
+            return scheduler.get(requests, image_url).content
+        image_url = str(self.input_json["novel_cover_image"])
+        cover_image = None
+        if(image_url != ""):
+            try:
+                cover_image = covers.from_url(image_url, download_cover)
+            except Exception as e:
+                print("Could not use the cover image " + image_url + ", generating one. Exception: ", e)
+        if(cover_image is None):
+            # Cover image not specified (or unusable), so I will create one
+            cover_image = covers.generated(title, author)
+        print("Cover: " + str(len(cover_image) // 1024) + " KB" + (" (from the cover cache)" if covers.hits else ""))
+
         # Set cover image
-        book.set_cover(cover_image_name, open(cover_image_name, 'rb').read())
+        book.set_cover("cover.jpg", cover_image)
         
         # Get website details
-        website_name = str(self.input_json["website_name"])
         website_url = str(self.input_json["website_root"])
         start_chapter = str(self.input_json["start_chapter_url"])
         page_url = website_url+start_chapter
@@ -566,117 +1191,253 @@ class EbookCreator(object):
 
         status = True
         i = self.input_json["start_chapter_number"] if self.input_json["start_chapter_number"] else 1
+        first_chapter_number = i
+
+        # Chapters are written to the EPUB as they are parsed (ordered by number when it is finished)
+        writer = StreamingEpubWriter(title + '.epub', book, {})
+
+        # Repeated chapters (same or nearly the same text, or a link back to a parsed chapter) are skipped
+        fingerprints = None
+        if(str(self.input_json.get("skip_duplicate_chapters", "true")) == "true"):
+            fingerprints = ChapterFingerprints(int(self.input_json.get("duplicate_distance", 3)),
+                                               int(self.input_json.get("duplicate_min_chars", 200)))
+        max_duplicates_in_row = int(self.input_json.get("max_duplicates_in_row", 3))
+        skipped_pages = []
+
+        # Chapter store: every parsed chapter is saved, so a rerun resumes after the last stored one
+        store = None
+        stored_urls = set()
+        if(str(self.input_json.get("chapter_store", "false")) == "true"):
+            store = ChapterStore(os.path.join(cache_dir, title + ".chapters.sqlite3"))
+            for number, url, chapterTitle, chapter_content, next_url in store.chapters():
+                writer.add_chapter(number, chapterTitle, chapter_content)
+                stored_urls.add(url)
+                if(fingerprints):
+                    fingerprints.add(number, url, fingerprints.fingerprint(chapter_text(chapter_content)))
+            for url, reason in store.skipped():
+                # skipped before, not downloaded again in table of contents mode
+                stored_urls.add(url)
+            last = store.last()
+            if(last):
+                number, url, next_url = last
+                print("Loaded " + str(len(writer.chapters)) + " chapters from " + store.path + ", last one is " + str(number))
+                if(next_url is None):
+                    # stored in table of contents mode: parse the last chapter again to find its next link
+                    page_url = url
+                    i = number
+                elif(next_url == "invalid"):
+                    print("The stored book is complete.")
+                    status = False
+                else:
+                    page_url = next_url
+                    i = number + 1
+            if(str(self.input_json.get("rebuild_from_store", "false")) == "true"):
+                print("Rebuilding the book from the chapter store only.")
+                status = False
 
         # Setup Selenium ChromeDriver
         use_selenium = str(self.input_json["use_selenium"])
         browser_choice = str(self.input_json["browser"])
-        if(use_selenium == "true"):
-            if(browser_choice == "firefox"):
-                # Path to your EXISTING Firefox profile (already logged in)
-                firefox_profile_path = "C:\\Users\\vinay\\AppData\\Roaming\\Mozilla\\Firefox\\Profiles\\spdu5de0.default-release"
-                options = FirefoxOptions()
-                # Load existing logged-in Firefox profile
-                options.add_argument("-profile")
-                options.add_argument(firefox_profile_path)
-                # Optional — REMOVE if login breaks
-                # options.add_argument("--headless")
-                driver = webdriver.Firefox(options=options)
+        if(use_selenium == "true" and offline):
+            print("Offline: selenium is not started, pages it fetched before are read from the HTTP cache.")
+            use_selenium = "false"
+        if(use_selenium == "true" and not site.selenium):
+            print("Selenium is not set up for " + website_name + " in " + SITE_REGISTRY.path + ", using plain requests.")
+            use_selenium = "false"
+        # Pool of browsers; more than one renders several chapters at once when their URLs are known
+        selenium_pool = None
+        # errors that end the book while following next chapter links
+        fetch_errors = (NotInHttpCache, FetchFailed)
+        if(use_selenium == "true" and status):
+            from selenium.common.exceptions import WebDriverException
+            fetch_errors = (NotInHttpCache, FetchFailed, WebDriverException)
+            pool_size = int(self.input_json.get("selenium_max_concurrency", {}).get(website_name, 1))
+            if(browser_choice == "firefox" and pool_size > 1):
+                print("The Firefox profile can only be opened once, using a single browser.")
+                pool_size = 1
+            selenium_pool = SeleniumDriverPool(browser_choice, site, pool_size,
+                                               int(self.input_json.get("selenium_pages_per_browser", 100)))
+
+        # For parallel fetching: one scraper per thread, the cloudscraper session is not shared between threads.
+        # Created on first use, selenium and offline runs may never need one.
+        scraper_local = threading.local()
+        def fetch_page(url, use_browser=True):
+            if(selenium_pool and use_browser):
+                scheduler.acquire(url)
+                page_content = selenium_pool.fetch(url)
+                if(http_cache):
+                    # kept so offline runs can parse selenium pages too
+                    http_cache.put(url, page_content.encode('utf-8'))
+                return page_content
+            if not hasattr(scraper_local, "session"):
+                import cloudscraper
+                scraper_local.session = PacedSession(scheduler, cloudscraper.create_scraper())
+            if(http_cache):
+                return http_cache.get(scraper_local.session, url)
+            return scraper_local.session.get(url).content
+
+        # Table of contents mode: read every chapter URL from the catalog page and download them in parallel
+        toc_pages = None
+        index_url = str(self.input_json.get("index_url", ""))
+        if(index_url != "" and status):
+            start_page_url = website_url+start_chapter
+            try:
+                index_soup = BeautifulSoup(fetch_page(website_url+index_url, False), "lxml")
+                chapter_urls = ChapterIndex().parse(site,index_soup,website_url+index_url,start_page_url)
+            except (NotInHttpCache, FetchFailed) as e:
+                print(e)
+                chapter_urls = []
+            if(start_page_url in chapter_urls):
+                chapter_urls = chapter_urls[chapter_urls.index(start_page_url):]
+            elif(chapter_urls):
+                print("Start chapter not found in the table of contents, downloading all chapters listed.")
+            # chapters are numbered by their position in the table of contents; stored ones are not downloaded again
+            toc_numbers = {}
+            for n, url in enumerate(chapter_urls):
+                toc_numbers.setdefault(url, first_chapter_number + n)
+            if(chapter_urls):
+                print("Found " + str(len(chapter_urls)) + " chapters in the table of contents.")
+            chapter_urls = [url for url in chapter_urls if url not in stored_urls]
+            if(not chapter_urls and toc_numbers):
+                print("All chapters of the table of contents are already stored.")
+                status = False
+            elif(chapter_urls):
+                downloader = ChapterDownloader(fetch_page, int(self.input_json.get("download_workers", 8)),
+                                               int(self.input_json.get("per_host_limit", 4)))
+                toc_pages = downloader.iter_pages(chapter_urls)
+            else:
+                print("No chapters found in the table of contents, following next chapter links.")
+
+        # Fetch the next chapters concurrently when their URLs are predictable
+        prefetcher = None
+        if(toc_pages is None and str(self.input_json.get("concurrent_fetch", "false")) == "true"):
+            if(not site.numbered_urls):
+                print("Chapter URLs of " + website_name + " are not predictable, fetching one chapter at a time.")
             else:
-                # Set up Chrome options for headless browsing
-                # For Edge use: chrome_options = EdgeOptions() and driver = webdriver.Edge(options=chrome_options) at the end...
-                chrome_options = Options()
-                chrome_options.add_argument('--headless')  # Run without opening browser window
-                chrome_options.add_argument('--disable-gpu')
-                chrome_options.add_argument('--no-sandbox')
-                chrome_options.add_argument("--log-level=1")
-                chrome_options.add_argument('--enable-unsafe-swiftshader')
-                # Initialize the WebDriver (assuming Chrome)
-                driver = webdriver.Chrome(options=chrome_options)
+                prefetch_window = int(self.input_json.get("prefetch_window", 8))
+                if(selenium_pool):
+                    # no point in guessing further ahead than there are browsers
+                    prefetch_window = selenium_pool.size
+                prefetcher = ChapterPrefetcher(fetch_page, prefetch_window)
 
+        duplicates_in_row = 0
         while status:
             
-            if(use_selenium == "true"):
-                if(website_name == "tomatomtl"):
-                    tag_name = "ID"
-                    id_name = "chapter_content"
-                    full_wait = False
-                elif(website_name == "biquge"):
-                    tag_name = "ID"
-                    id_name = "chaptercontent"
-                    full_wait = False
-                elif(website_name == "tongrenquan"):
-                    tag_name = "CLASS"
-                    id_name = "read_chapterDetail"
-                    full_wait = True
-                elif(website_name == "bixiange"):
-                    tag_name = "CLASS"
-                    id_name = "content"
-                    full_wait = True
-                
-                # Implicitly wait a while for the full page to load
-                if(full_wait):
-                    driver.implicitly_wait(3)  # waits up to 5 seconds for elements to appear
-
-                driver.get(page_url)
-                
-                # time.sleep(300)
-                # Wait for the content to load
-                # Wait up to 10 seconds for the chapter content to appear
-                if(tag_name=="ID"):
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.ID, id_name))
-                    )
-                    # Give extra time for all content to render
-                    time.sleep(5)
-                    # Find the chapter content
-                    content_div = driver.find_element(By.ID, id_name)
-                elif(tag_name=="CLASS"):
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, id_name))
-                    )
-                    time.sleep(5)
-                    # Find the chapter content
-                    content_div = driver.find_element(By.CLASS_NAME, id_name)
-                
-                if not content_div:
-                    return "Could not find chapter content on the page"
-                page_content = driver.page_source #driver.find_elements(By.TAG_NAME, 'html')
+            if(toc_pages is not None):
+                page_url, page_content = next(toc_pages, (None, None))
+                if(page_url is None):
+                    break
+                i = toc_numbers[page_url]
+                if(page_content is None):
+                    # download failed and was reported
+                    continue
             else:
+                if(fingerprints and fingerprints.urls.get(page_url, i) != i):
+                    # a parsed chapter under a new number, e.g. the loop target a stored book was left at
+                    reason = "link back to chapter " + str(fingerprints.urls[page_url])
+                    print("Loop detected: " + reason + ". Ending book here.")
+                    skipped_pages.append((page_url, reason))
+                    if(store):
+                        store.end()
+                    break
                 #First timeout is for session and second is for page wait
                 #page_content = requests.get(page_url, timeout=(10, 10)).content 
-                page_content = scraper.get(page_url).content
+                try:
+                    if(prefetcher):
+                        page_content = prefetcher.get(page_url)
+                    else:
+                        page_content = fetch_page(page_url)
+                except fetch_errors as e:
+                    print("Could not load " + page_url + ". Ending book here. Exception: ", e)
+                    break
             
 
             try:
                 #print(page_content)
-                soup = BeautifulSoup(page_content, "lxml")
+                soup = site.parse_page(page_content)
 
-                chapterTitle = ChapterTitle().parse(website_name,soup)
+                chapterTitle = site.title(soup)
                 if(chapterTitle=="invalid"):
                     chapterTitle = "Chapter "+str(i)
-                chapter_content = ChapterContent().parse(website_name,soup,chapterTitle)
-
-                # Creates a chapter
-                c1 = epub.EpubHtml(title=chapterTitle, file_name='chap_'+str(i)+'.xhtml', lang='hr')
-                c1.content = chapter_content
-                book.add_item(c1)
-
-                # Add to table of contents
-                book.toc.append(c1)    
+                # before content(), which removes the links from the chapter body (tracan's next link is in there)
+                next_url = None
+                if(toc_pages is None):
+                    next_url = site.next_link(soup,website_url,page_url)
+                chapter_content = site.content(soup,chapterTitle)
 
-                # Add to book ordering            
-                book.spine.append(c1)
+                duplicate = None
+                if(fingerprints):
+                    fingerprint = fingerprints.fingerprint(chapter_text(chapter_content))
+                    duplicate = fingerprints.duplicate_of(page_url, fingerprint)
+                if(duplicate is None):
+                    writer.add_chapter(i, chapterTitle, chapter_content)
+                    print("Parsed " + str(i) + " - " + chapterTitle)
+                    if(fingerprints):
+                        fingerprints.add(i, page_url, fingerprint)
+                    if(store):
+                        store.save(i, page_url, chapterTitle, chapter_content, next_url)
+                    duplicates_in_row = 0
+                    i = i + 1
+                else:
+                    print("Skipped " + page_url + ": " + duplicate)
+                    skipped_pages.append((page_url, duplicate))
+                    if(store):
+                        store.skip(page_url, duplicate)
+                    duplicates_in_row += 1
 
-                print("Parsed " + str(i) + " - " + chapterTitle)
-                page_url = NextChapterLink().parse(website_name,soup,website_url,page_url) #self.get_next_chapter_link()
-                if(page_url=="invalid"):
+                if(toc_pages is None):
+                    if(fingerprints and next_url in fingerprints.urls):
+                        # a link back to a parsed chapter would go round in circles
+                        reason = "link back to chapter " + str(fingerprints.urls[next_url]) + " from " + page_url
+                        print("Loop detected: " + reason + ". Ending book here.")
+                        skipped_pages.append((next_url, reason))
+                        if(store):
+                            store.end()
+                        status = False
+                    elif(duplicates_in_row >= max_duplicates_in_row):
+                        print(str(duplicates_in_row) + " repeated pages in a row. Ending book here.")
+                        status = False
+                    page_url = next_url
+                    if(page_url=="invalid"):
+                        status = False
+            except Exception as e:
+                if(toc_pages is not None):
+                    # the chapter list is known, so one broken page does not end the book
+                    print("Error occurred. Skipping " + page_url + ". Exception: ", e)
+                else:
+                    print("Error occurred. Ending book here. Exception: ", e)
                     status = False
 
-                i = i + 1
-                #time.sleep(3)
-            except Exception as e:
-                print("Error occurred. Ending book here. Exception: ", e)
-                status = False
+        if(skipped_pages):
+            print("Skipped " + str(len(skipped_pages)) + " page(s)" + (" (recorded in " + store.path + ")" if store else "") + ":")
+            for url, reason in skipped_pages:
+                print("  " + url + ": " + reason)
+        if(toc_pages is not None):
+            # stops the downloader's threads if the loop ended early
+            toc_pages.close()
+        if(prefetcher):
+            prefetcher.close()
+            print("Prefetched chapters used: " + str(prefetcher.hits) + ", fetched directly: " + str(prefetcher.misses))
+        if(scheduler.retried):
+            print("Requests: " + str(scheduler.requests) + ", retried: " + str(scheduler.retried)
+                  + ", failure budget left: " + str(scheduler.failure_budget))
+        if(TRANSLATION_CACHE.hits or TRANSLATION_CACHE.misses):
+            print("Translations from cache: " + str(TRANSLATION_CACHE.hits) + ", translated: " + str(TRANSLATION_CACHE.misses))
+        TRANSLATION_CACHE.close()
+        if(selenium_pool):
+            waits = selenium_pool.readiness.waits
+            if(waits):
+                # the old fixed waits slept at least 5s per chapter
+                print("Selenium waits: " + str(len(waits)) + " pages, " + str(round(sum(waits), 1)) + "s in total, "
+                      + str(round(sum(waits) / len(waits), 2)) + "s on average (fixed sleeps: " + str(5 * len(waits)) + "s), "
+                      + str(selenium_pool.size) + " browser(s), " + str(selenium_pool.restarts) + " restart(s)")
+            selenium_pool.close()
+        if(http_cache):
+            print("HTTP cache: " + str(http_cache.hits) + " read offline, " + str(http_cache.revalidated) + " not modified, "
+                  + str(http_cache.misses) + " downloaded")
+            http_cache.close()
+        if(store):
+            store.close()
 
         book.add_item(epub.EpubNcx())
         book.add_item(epub.EpubNav())
@@ -688,12 +1449,16 @@ class EbookCreator(object):
         # Adds CSS file
         book.add_item(nav_css)
 
-        epub.write_epub(title + '.epub', book, {})
+        writer.finish()
 
         return
 
 def main():
-    ep = EbookCreator()
+    parser = argparse.ArgumentParser(description="Scrape a web novel into an EPUB.")
+    parser.add_argument("input_file", nargs="?", default="parser_inputs.json", help="parser inputs JSON (default: parser_inputs.json)")
+    parser.add_argument("--offline", action="store_true", help="never touch the network, read every page from the HTTP cache")
+    args = parser.parse_args()
+    ep = EbookCreator(args.input_file, args.offline)
     ep.start_parsing()
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+"""
+benchmark_glossary_matcher.py
+
+Compare the matcher engines of chinese_text_replacement.py on a synthetic glossary and novel.
+ - builds a glossary of random CJK keys (2-6 chars) and a multi-megabyte text that uses them
+ - times build (compile) and scan for the 'regex' and 'aho-corasick' engines
+ - checks that both engines produce exactly the same output
+ - the regex engine is O(text * keys), so by default it only scans a sample and the full-text time is extrapolated
+"""
+import random
+import re
+import time
+
+from chinese_text_replacement import build_pattern_string_from_keys, AhoCorasickMatcher
+
+# Common CJK block, narrowed so keys overlap and share prefixes like a real glossary
+CJK_START = 0x4E00
+CJK_RANGE = 3000
+
+def random_cjk(rng: random.Random, length: int) -> str:
+    return ''.join(chr(CJK_START + rng.randrange(CJK_RANGE)) for _ in range(length))
+
+def make_glossary(rng: random.Random, num_keys: int):
+    mapping = {}
+    while len(mapping) < num_keys:
+        key = random_cjk(rng, rng.randint(2, 6))
+        if key not in mapping:
+            mapping[key] = f"Term{len(mapping)}"
+    return mapping
+
+def make_novel(rng: random.Random, keys, target_chars: int) -> str:
+    parts = []
+    size = 0
+    while size < target_chars:
+        # roughly one glossary hit per 20 characters of filler, one line per ~60 characters
+        if rng.random() < 0.3:
+            piece = rng.choice(keys)
+        else:
+            piece = random_cjk(rng, rng.randint(5, 30))
+        if rng.random() < 0.1:
+            piece += '\n'
+        parts.append(piece)
+        size += len(piece)
+    return ''.join(parts)
+
+def run_engine(name, build, text, mapping):
+    start = time.perf_counter()
+    matcher = build()
+    built = time.perf_counter()
+    count = 0
+    def repl(m):
+        nonlocal count
+        count += 1
+        return ' ' + mapping.get(m.group(0), m.group(0)) + ' '
+    out = matcher.sub(repl, text)
+    scanned = time.perf_counter()
+    print(f"{name:<13} build: {built - start:8.2f}s   scan: {scanned - built:8.2f}s over {len(text):,} chars   "
+          f"({len(text) / max(scanned - built, 1e-9) / 1e6:.3f} M chars/s)   replacements: {count}")
+    return out, scanned - built
+
+if __name__ == "__main__":
+    num_keys = 50000
+    novel_chars = 3_000_000  # ~9 MB as UTF-8
+    regex_sample_chars = 100_000  # set to None to let the regex scan the whole novel (takes many minutes)
+    seed = 42
+
+    rng = random.Random(seed)
+    print(f"Generating {num_keys} glossary keys and a {novel_chars:,}-character novel...")
+    mapping = make_glossary(rng, num_keys)
+    keys = list(mapping.keys())
+    text = make_novel(rng, keys, novel_chars)
+
+    regex_text = text[:regex_sample_chars] if regex_sample_chars else text
+    pattern_str = build_pattern_string_from_keys(keys)
+    out_regex, regex_scan = run_engine('regex', lambda: re.compile(pattern_str), regex_text, mapping)
+    out_ac, ac_scan = run_engine('aho-corasick', lambda: AhoCorasickMatcher(keys), text, mapping)
+
+    if len(regex_text) < len(text):
+        estimate = regex_scan * len(text) / max(len(regex_text), 1)
+        print(f"regex full-novel scan estimated at {estimate:.1f}s ({estimate / max(ac_scan, 1e-9):.0f}x aho-corasick)")
+        out_ac = AhoCorasickMatcher(keys).sub(lambda m: ' ' + mapping[m.group(0)] + ' ', regex_text)
+
+    if out_regex == out_ac:
+        print("Outputs identical.")
+    else:
+        print("WARNING: outputs differ!")
@@ -0,0 +1,108 @@
+"""
+benchmark_paragraph_runs.py
+
+Micro-benchmark for mapping glossary replacements back onto .docx runs (chinese_text_replacement.py).
+ - builds serialized paragraphs with hundreds of runs and alternating styles
+ - times the previous per-character style list against rebuild_paragraph_runs (run offsets + bisect)
+ - checks both produce the same chunks
+"""
+import random
+import time
+
+from chinese_text_replacement import AhoCorasickMatcher, rebuild_paragraph_runs, _run_style
+
+CJK_START = 0x4E00
+CJK_RANGE = 500
+
+def legacy_rebuild(serial, pattern, mapping):
+    """
+    The previous implementation: one style reference per character, re-scanned char by char.
+    """
+    full_text = serial['text']
+    if not full_text:
+        return None, 0
+    char_styles = []
+    for r in serial['runs']:
+        style = _run_style(r)
+        for _ in r['text']:
+            char_styles.append(style)
+
+    matches = list(pattern.finditer(full_text))
+    if not matches:
+        # untouched paragraphs are reported as None, like rebuild_paragraph_runs
+        return None, 0
+
+    def split_by_style(start, text, out):
+        run_start = 0
+        while run_start < len(text):
+            cur_style = char_styles[start + run_start]
+            seg_len = 1
+            while run_start + seg_len < len(text) and char_styles[start + run_start + seg_len] == cur_style:
+                seg_len += 1
+            out.append((text[run_start:run_start + seg_len], cur_style))
+            run_start += seg_len
+
+    rebuilt_chunks = []
+    pos = 0
+    count = 0
+    for m in matches:
+        s, e = m.start(), m.end()
+        if s > pos:
+            split_by_style(pos, full_text[pos:s], rebuilt_chunks)
+        key = m.group(0)
+        rebuilt_chunks.append((' ' + mapping.get(key, key) + ' ', char_styles[s]))
+        count += 1
+        pos = e
+    if pos < len(full_text):
+        split_by_style(pos, full_text[pos:], rebuilt_chunks)
+
+    merged = []
+    for t, st in rebuilt_chunks:
+        if not t:
+            continue
+        if merged and merged[-1][1] == st:
+            merged[-1] = (merged[-1][0] + t, st)
+        else:
+            merged.append((t, st))
+    return merged, count
+
+def make_paragraph(rng: random.Random, keys, num_runs: int):
+    runs = []
+    for i in range(num_runs):
+        text = ''.join(chr(CJK_START + rng.randrange(CJK_RANGE)) for _ in range(rng.randint(3, 40)))
+        if rng.random() < 0.3:
+            text += rng.choice(keys)
+        runs.append({'text': text, 'bold': i % 2 == 0, 'italic': i % 3 == 0, 'underline': None, 'style': None})
+    return {'runs': runs, 'text': ''.join(r['text'] for r in runs)}
+
+def time_it(fn, paragraphs, matcher, mapping, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [fn(p, matcher, mapping) for p in paragraphs]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+if __name__ == "__main__":
+    num_paragraphs = 200
+    runs_per_paragraph = 400
+    num_keys = 2000
+    repeat = 3
+    seed = 7
+
+    rng = random.Random(seed)
+    mapping = {}
+    while len(mapping) < num_keys:
+        mapping[''.join(chr(CJK_START + rng.randrange(CJK_RANGE)) for _ in range(rng.randint(2, 4)))] = f"Term{len(mapping)}"
+    keys = list(mapping.keys())
+    matcher = AhoCorasickMatcher(keys)
+    paragraphs = [make_paragraph(rng, keys, runs_per_paragraph) for _ in range(num_paragraphs)]
+    chars = sum(len(p['text']) for p in paragraphs)
+    print(f"{num_paragraphs} paragraphs x {runs_per_paragraph} runs, {chars:,} characters")
+
+    legacy_time, legacy_results = time_it(legacy_rebuild, paragraphs, matcher, mapping, repeat)
+    offset_time, offset_results = time_it(rebuild_paragraph_runs, paragraphs, matcher, mapping, repeat)
+    print(f"per-character styles: {legacy_time:8.3f}s")
+    print(f"run offsets + bisect: {offset_time:8.3f}s   ({legacy_time / max(offset_time, 1e-9):.1f}x)")
+    print("Outputs identical." if legacy_results == offset_results else "WARNING: outputs differ!")
@@ -7,18 +7,38 @@ Features:
  - keep first mapping when duplicates exist
  - prefer longest match when multiple keys overlap
  - add a space before and after the replacement English text
- - preserve docx run formatting as far as possible
+ - preserve docx run formatting as far as possible; paragraphs without replacements are never rewritten
  - --fast-serialize: trade some formatting accuracy for much faster paragraph reading on large .docx
+ - .docx 'xml' engine: stream word/document.xml with lxml and rewrite <w:t> text in place, no python-docx objects
  - progress bars (tqdm) shown during serialization and replacement
- - parallel processing (multiprocessing)
- - prints total replacements and writes output file
+ - .txt block mode: file split into large line-aligned blocks, replaced in parallel and streamed to disk in order
+ - parallel processing (multiprocessing); matcher and mapping are built once per worker, tasks carry only text
+ - matcher engines: 'regex' (one big alternation) or 'aho-corasick' (trie automaton, same results, scales to huge glossaries)
+ - incremental mode: after a glossary update only lines / body elements affected by added, changed or removed keys are replaced again
+ - batch mode: a JSON manifest of (input, output, glossary) jobs, one long-lived worker pool per glossary,
+   next book's input file warmed into the OS page cache while the current one is replaced, a failed
+   glossary or job is recorded in <manifest>.results.json and the batch goes on
+ - compiled glossary cached next to the glossary file (keyed by size/mtime, then content hash), rebuilt when stale
+ - prints total replacements and per-stage timings (IPC payload sizes too with measure_ipc), and writes output file
+ - replacement statistics: per-key hit counts, hot keys, unused (dead) glossary keys, stage timings and
+   chars/second throughput, optionally exported as JSON (<output>.stats.json)
 """
 from __future__ import annotations
 import argparse
+import hashlib
+import json
+import mmap
+import pickle
 import re
+import shutil
 import sys
 import os
-from collections import OrderedDict
+import time
+import zipfile
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import List, Dict, Tuple, Any
 from multiprocessing import Pool, cpu_count
 from tqdm import tqdm
@@ -30,6 +50,12 @@ try:
 except Exception:
     Document = None
 
+# lxml (only needed by the document.xml engine; python-docx depends on it anyway)
+try:
+    from lxml import etree
+except Exception:
+    etree = None
+
 # -------------------------
 # Mapping utilities
 # -------------------------
@@ -53,49 +79,745 @@ def build_pattern_string_from_keys(keys: List[str]) -> str:
     # sort by length descending to favor longest matches
     keys_sorted = sorted(keys, key=lambda s: len(s), reverse=True)
     escaped = [re.escape(k) for k in keys_sorted]
+    if not escaped:
+        # '()' would match the empty string everywhere; match nothing, like the aho-corasick engine
+        return '(?!)'
     pattern_str = '(' + '|'.join(escaped) + ')'
     return pattern_str
 
+# -------------------------
+# Aho-Corasick matcher
+# -------------------------
+class _ACMatch(object):
+    """
+    Minimal stand-in for re.Match so workers can treat both engines the same.
+    """
+    __slots__ = ('_text', '_start', '_end')
+
+    def __init__(self, text: str, start: int, end: int):
+        self._text = text
+        self._start = start
+        self._end = end
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+    def group(self, idx: int = 0) -> str:
+        return self._text[self._start:self._end]
+
+class AhoCorasickMatcher(object):
+    """
+    Trie + failure-link automaton over the glossary keys.
+    Gives the same matches as the length-sorted alternation regex: scanning left to right,
+    the earliest starting key wins, ties go to the longest key, matches never overlap.
+    Exposes finditer()/sub() so it can be used wherever the compiled regex was.
+    """
+    def __init__(self, keys: List[str]):
+        # node 0 is the root; goto[n] maps char -> child node
+        self.goto: List[Dict[str,int]] = [{}]
+        self.fail: List[int] = [0]
+        self.depth: List[int] = [0]
+        # length of the longest key that is a suffix of the node's string (0 = none)
+        self.best: List[int] = [0]
+        for key in keys:
+            if key:
+                self._add(key)
+        self._link()
+
+    def _add(self, key: str):
+        goto = self.goto
+        node = 0
+        for ch in key:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[node][ch] = nxt
+                goto.append({})
+                self.fail.append(0)
+                self.depth.append(self.depth[node] + 1)
+                self.best.append(0)
+            node = nxt
+        self.best[node] = len(key)
+
+    def _link(self):
+        # breadth-first so every fail target is finished before it is used
+        goto, fail, best = self.goto, self.fail, self.best
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[child] = target if target != child else 0
+                if not best[child]:
+                    best[child] = best[fail[child]]
+                queue.append(child)
+
+    def spans(self, text: str):
+        """
+        Yield (start, end) for every leftmost-longest, non-overlapping match.
+        """
+        goto, fail, depth, best = self.goto, self.fail, self.depth, self.best
+        n = len(text)
+        i = 0
+        while i < n:
+            state = 0
+            cand_start = -1
+            cand_end = -1
+            while i < n:
+                ch = text[i]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                i += 1
+                # once the automaton can only report matches starting after the candidate, it is final
+                if cand_start >= 0 and i - depth[state] > cand_start:
+                    break
+                length = best[state]
+                if length:
+                    start = i - length
+                    if cand_start < 0 or start < cand_start or (start == cand_start and i > cand_end):
+                        cand_start = start
+                        cand_end = i
+            if cand_start < 0:
+                return
+            yield cand_start, cand_end
+            # resume right after the match, exactly like re does
+            i = cand_end
+
+    def finditer(self, text: str):
+        for s, e in self.spans(text):
+            yield _ACMatch(text, s, e)
+
+    def sub(self, repl, text: str) -> str:
+        out = []
+        pos = 0
+        for s, e in self.spans(text):
+            out.append(text[pos:s])
+            out.append(repl(_ACMatch(text, s, e)))
+            pos = e
+        if not out:
+            return text
+        out.append(text[pos:])
+        return ''.join(out)
+
+MATCHER_ENGINES = ('regex', 'aho-corasick')
+
+# per-process cache so workers build each matcher only once
+_MATCHER_CACHE: Dict[Tuple[str,str], Any] = {}
+
+def get_matcher(engine: str, pattern_str: str, mapping: Dict[str,str]):
+    """
+    Return a compiled matcher for the chosen engine ('regex' or 'aho-corasick').
+    Both expose finditer() and sub() with identical results.
+    """
+    # pattern_str identifies the key set for both engines (joining keys is cheap, compiling is not)
+    cache_key = (engine, pattern_str)
+    matcher = _MATCHER_CACHE.get(cache_key)
+    if matcher is None:
+        if engine == 'regex':
+            matcher = re.compile(pattern_str)
+        elif engine == 'aho-corasick':
+            matcher = AhoCorasickMatcher(list(mapping.keys()))
+        else:
+            raise ValueError(f"Unknown matcher engine: {engine} (expected one of {', '.join(MATCHER_ENGINES)})")
+        _MATCHER_CACHE.clear()
+        _MATCHER_CACHE[cache_key] = matcher
+    return matcher
+
+def register_matcher(engine: str, pattern_str: str, matcher):
+    """
+    Seed the per-process cache with an already built matcher (e.g. loaded from the glossary cache file).
+    """
+    _MATCHER_CACHE.clear()
+    _MATCHER_CACHE[(engine, pattern_str)] = matcher
+
+# -------------------------
+# Compiled glossary cache (stored next to the glossary)
+# -------------------------
+GLOSSARY_CACHE_MAGIC = b'CTR-GLOSSARY-CACHE 1\n'
+
+def glossary_cache_path(mapping_path: str, engine: str) -> str:
+    return f"{mapping_path}.{engine}.cache"
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _read_glossary_cache(cache_path: str):
+    """
+    Read (header, payload) from a cache file through mmap, or (None, None) if missing/corrupt.
+    Layout: magic line, one line of JSON header, then the pickled (mapping, pattern_str, matcher).
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:len(GLOSSARY_CACHE_MAGIC)] != GLOSSARY_CACHE_MAGIC:
+                    return None, None
+                header_end = mm.find(b'\n', len(GLOSSARY_CACHE_MAGIC))
+                if header_end < 0:
+                    return None, None
+                header = json.loads(mm[len(GLOSSARY_CACHE_MAGIC):header_end])
+                view = memoryview(mm)[header_end + 1:]
+                try:
+                    payload = pickle.loads(view)
+                finally:
+                    view.release()
+                return header, payload
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None, None
+
+def _write_glossary_cache(cache_path: str, header: Dict[str,Any], payload):
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(GLOSSARY_CACHE_MAGIC)
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write glossary cache {cache_path}: {e}")
+
+def load_compiled_glossary(mapping_path: str, engine: str, use_cache: bool = True) -> Tuple[OrderedDict, str, str]:
+    """
+    Load mapping + pattern string and make the compiled matcher available through get_matcher().
+    The cache is valid when the glossary's size and mtime match; if only the mtime moved, the
+    content hash decides. A stale or missing cache is rebuilt and rewritten.
+    Returns (mapping, pattern_str, cache_path); cache_path is None when caching is off.
+    """
+    if engine not in MATCHER_ENGINES:
+        raise ValueError(f"Unknown matcher engine: {engine} (expected one of {', '.join(MATCHER_ENGINES)})")
+    if not use_cache:
+        mapping = load_mappings(mapping_path)
+        return mapping, build_pattern_string_from_keys(list(mapping.keys())), None
+
+    cache_path = glossary_cache_path(mapping_path, engine)
+    st = os.stat(mapping_path)
+    header, payload = _read_glossary_cache(cache_path)
+    valid = False
+    content_hash = None
+    if header is not None and header.get('engine') == engine:
+        if header.get('size') == st.st_size and header.get('mtime_ns') == st.st_mtime_ns:
+            valid = True
+        else:
+            content_hash = _file_sha256(mapping_path)
+            valid = header.get('sha256') == content_hash
+
+    if valid:
+        mapping, pattern_str, matcher = payload
+        print(f"Loaded compiled glossary from cache: {cache_path}")
+        if header.get('mtime_ns') != st.st_mtime_ns:
+            # same content, new mtime: refresh the header so the next run takes the fast path
+            _write_glossary_cache(cache_path, dict(header, size=st.st_size, mtime_ns=st.st_mtime_ns), payload)
+    else:
+        mapping = load_mappings(mapping_path)
+        pattern_str = build_pattern_string_from_keys(list(mapping.keys()))
+        # compiled regex objects re-compile on unpickling, so only the aho-corasick automaton is stored
+        matcher = get_matcher(engine, pattern_str, mapping) if engine == 'aho-corasick' else None
+        header = {
+            'engine': engine,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': content_hash or _file_sha256(mapping_path),
+        }
+        _write_glossary_cache(cache_path, header, (mapping, pattern_str, matcher))
+        print(f"Glossary cache rebuilt: {cache_path}")
+
+    if matcher is not None:
+        register_matcher(engine, pattern_str, matcher)
+    return mapping, pattern_str, cache_path
+
+# -------------------------
+# Stage timings
+# -------------------------
+class StageTimer(object):
+    """
+    Collects wall-clock seconds per named stage plus a few counters (e.g. IPC bytes),
+    the number of characters scanned and how often each glossary key matched.
+    Printed as a summary at the end of a run and optionally exported as JSON.
+    IPC bytes are only measured with measure_ipc: it pickles every task payload one extra time.
+    Incremental runs only scan the units (lines / body elements) that are replaced again, so chars
+    and the hit counts cover those; count_incremental records the totals of the whole input next to them.
+    """
+    def __init__(self, measure_ipc: bool = False):
+        self.measure_ipc = measure_ipc
+        self.stages: Dict[str,float] = OrderedDict()
+        self.counters: Dict[str,int] = OrderedDict()
+        self.hits: Dict[str,int] = {}
+        # keys found in units reused by incremental mode (not counted again, but not dead either)
+        self.reused_keys: set = set()
+        # characters scanned by the matcher
+        self.chars = 0
+        # (unit name, units in the input, units replaced again, characters in the input) of an incremental run
+        self.incremental: Tuple[str,int,int,int] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start)
+
+    def count(self, name: str, amount: int):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_incremental(self, unit: str, total_units: int, replaced_units: int, total_chars: int):
+        self.incremental = (unit, total_units, replaced_units, total_chars)
+
+    def add_hits(self, hits: Dict[str,int]):
+        for key, n in hits.items():
+            self.hits[key] = self.hits.get(key, 0) + n
+
+    def hot_keys(self, top: int = None) -> List[Tuple[str,int]]:
+        ranked = sorted(self.hits.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked if top is None else ranked[:top]
+
+    def dead_keys(self, mapping: Dict[str,str]) -> List[str]:
+        return [k for k in mapping if k not in self.hits and k not in self.reused_keys]
+
+    def throughput(self) -> float:
+        total = sum(self.stages.values())
+        return self.chars / total if total > 0 else 0.0
+
+    def report(self, mapping: Dict[str,str] = None, top: int = 10):
+        print("Stage timings:")
+        for name, seconds in self.stages.items():
+            print(f"  {name:<28} {seconds:10.2f}s")
+        print(f"  {'total':<28} {sum(self.stages.values()):10.2f}s")
+        if self.chars:
+            print(f"  {'throughput':<28} {self.throughput():10,.0f} chars/s over {self.chars:,} chars")
+        if self.incremental:
+            unit, total_units, replaced_units, total_chars = self.incremental
+            print(f"  {'incremental':<28} {replaced_units:,} of {total_units:,} {unit} replaced again, "
+                  f"{self.chars:,} of {total_chars:,} chars scanned")
+        for name, value in self.counters.items():
+            print(f"  {name:<52} {value:,}")
+        if self.hits:
+            print(f"Hot keys (top {top} of {len(self.hits)} matched):")
+            for key, n in self.hot_keys(top):
+                print(f"  {n:10,}  {key}")
+        if mapping:
+            print(f"Glossary keys never matched: {len(self.dead_keys(mapping))} of {len(mapping)}")
+
+    def to_dict(self, mapping: Dict[str,str] = None) -> Dict[str,Any]:
+        total = sum(self.stages.values())
+        data: Dict[str,Any] = OrderedDict()
+        data['stages'] = OrderedDict((name, round(sec, 4)) for name, sec in self.stages.items())
+        data['total_seconds'] = round(total, 4)
+        data['chars_total'] = self.incremental[3] if self.incremental else self.chars
+        data['chars_scanned'] = self.chars
+        data['chars_per_second'] = round(self.throughput(), 1)
+        if self.incremental:
+            # replacements, hits and chars_scanned only cover the units replaced again
+            unit, total_units, replaced_units, _ = self.incremental
+            data['incremental'] = OrderedDict([('unit', unit), ('units_total', total_units), ('units_replaced', replaced_units),
+                                               ('units_reused', total_units - replaced_units),
+                                               ('keys_in_reused_units', len(self.reused_keys))])
+        data['counters'] = OrderedDict(self.counters)
+        data['replacements'] = sum(self.hits.values())
+        data['keys_matched'] = len(self.hits)
+        data['hits'] = OrderedDict(self.hot_keys())
+        if mapping is not None:
+            dead = self.dead_keys(mapping)
+            data['glossary_keys'] = len(mapping)
+            data['dead_keys_count'] = len(dead)
+            data['dead_keys'] = dead
+        return data
+
+    def export_json(self, path: str, mapping: Dict[str,str] = None, **info):
+        """
+        Write the statistics (plus any extra info such as input/output/engine) as JSON.
+        """
+        data = OrderedDict(info)
+        data.update(self.to_dict(mapping))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+
+def replacement_stats_path(output_path: str) -> str:
+    return output_path + '.stats.json'
+
+# -------------------------
+# Worker state (built once per process)
+# -------------------------
+_worker_matcher = None
+_worker_mapping: Dict[str,str] = {}
+
+def init_replacement_worker(engine: str, pattern_str: str, mapping: Dict[str,str], cache_path: str = None):
+    """
+    Pool initializer: build the matcher and keep the mapping once per worker process,
+    so tasks only need to carry text. With the 'fork' start method the matcher the
+    parent already built is inherited through _MATCHER_CACHE and nothing is recompiled;
+    otherwise it is loaded from the glossary cache file when one is given.
+    """
+    global _worker_matcher, _worker_mapping
+    if cache_path and (engine, pattern_str) not in _MATCHER_CACHE:
+        _, payload = _read_glossary_cache(cache_path)
+        if payload is not None and payload[2] is not None and payload[1] == pattern_str:
+            register_matcher(engine, pattern_str, payload[2])
+    _worker_matcher = get_matcher(engine, pattern_str, mapping)
+    _worker_mapping = mapping
+
+@contextmanager
+def _worker_pool(pool, workers: int, init_args: tuple):
+    """
+    Yield the caller's long-lived pool (batch mode, already initialized with this glossary)
+    or create one just for this call.
+    """
+    if pool is not None:
+        yield pool
+        return
+    with Pool(processes=workers, initializer=init_replacement_worker, initargs=init_args) as p:
+        yield p
+
+def _record_ipc(timer: StageTimer, init_args: tuple, task_bytes: int, num_tasks: int, workers: int):
+    # pickle once to measure what crosses the process boundary, and what the old per-task design used to send;
+    # callers only get here with timer.measure_ipc, as measuring costs an extra pass over the input
+    init_bytes = len(pickle.dumps(init_args))
+    timer.count('ipc: initializer bytes (all workers, spawn only)', init_bytes * workers)
+    timer.count('ipc: task bytes', task_bytes)
+    timer.count('ipc: task bytes with per-task glossary (old)', task_bytes + init_bytes * num_tasks)
+
 # -------------------------
 # TXT processing (line-level, parallel)
 # -------------------------
-def replace_in_line_worker(args: Tuple[str, str, Dict[str,str]]):
+def replace_in_line_worker(line: str):
     """
-    Worker for txt: receives (line, pattern_str, mapping)
-    Recompile pattern in worker for reliability across platforms.
-    Returns (new_line, count)
+    Worker for txt: receives just the line (or a block of whole lines); matcher and mapping come from init_replacement_worker.
+    Returns (new_line, count, {key: hits})
     """
-    line, pattern_str, mapping = args
-    pattern = re.compile(pattern_str)
+    pattern = _worker_matcher
+    mapping = _worker_mapping
+    hits: Dict[str,int] = {}
     count = 0
     def repl(m):
         nonlocal count
         key = m.group(0)
         repl_text = mapping.get(key, key)
+        hits[key] = hits.get(key, 0) + 1
         count += 1
         return ' ' + repl_text + ' '
     new_line = pattern.sub(repl, line)
-    return new_line, count
+    return new_line, count, hits
 
-def process_txt(input_path: str, output_path: str, pattern_str: str, mapping: Dict[str,str], workers:int) -> int:
-    with open(input_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+def process_txt(input_path: str, output_path: str, pattern_str: str, mapping: Dict[str,str], workers:int, engine: str = 'regex', timer: StageTimer = None, cache_path: str = None, pool=None) -> int:
+    timer = timer or StageTimer()
+    with timer.stage('read'):
+        with open(input_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    timer.chars += sum(len(line) for line in lines)
 
     total_lines = len(lines)
-    args_iter = ((lines[i], pattern_str, mapping) for i in range(total_lines))
-
     replaced_lines = [None] * total_lines
     total_replacements = 0
 
+    # build in the parent first: forked workers inherit it instead of compiling again
+    with timer.stage('compile'):
+        get_matcher(engine, pattern_str, mapping)
+    init_args = (engine, pattern_str, mapping, cache_path)
+    if timer.measure_ipc:
+        _record_ipc(timer, init_args, len(pickle.dumps(lines)), total_lines, workers)
+
     # Use imap to maintain order and show progress
-    with Pool(processes=workers) as p:
-        for i, (new_line, count) in enumerate(tqdm(p.imap(replace_in_line_worker, args_iter, chunksize=200),
-                                                   total=total_lines, desc="Processing lines")):
-            replaced_lines[i] = new_line
-            total_replacements += count
+    with timer.stage('replace'):
+        with _worker_pool(pool, workers, init_args) as p:
+            for i, (new_line, count, hits) in enumerate(tqdm(p.imap(replace_in_line_worker, lines, chunksize=200),
+                                                             total=total_lines, desc="Processing lines")):
+                replaced_lines[i] = new_line
+                total_replacements += count
+                if hits:
+                    timer.add_hits(hits)
+
+    with timer.stage('write'):
+        discard_incremental_state(output_path)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.writelines(replaced_lines)
+
+    return total_replacements
+
+# -------------------------
+# TXT processing (block-level, parallel, streamed)
+# -------------------------
+def iter_text_blocks(input_path: str, block_bytes: int):
+    """
+    Yield (text, raw_size) blocks of roughly block_bytes that always end on a line boundary.
+    Splitting on b'\n' is safe for UTF-8 and no glossary key contains a newline,
+    so replacing block by block gives exactly the same result as line by line.
+    Newlines are normalized like text-mode reading does.
+    """
+    with open(input_path, 'rb') as f:
+        while True:
+            raw = f.read(block_bytes)
+            if not raw:
+                break
+            if not raw.endswith(b'\n'):
+                raw += f.readline()
+            text = raw.decode('utf-8')
+            if '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            yield text, len(raw)
+
+def process_txt_blocks(input_path: str, output_path: str, pattern_str: str, mapping: Dict[str,str], workers:int, engine: str = 'regex', timer: StageTimer = None, cache_path: str = None, block_bytes: int = None, pool=None) -> int:
+    """
+    Same result as process_txt, but instead of one task per line the file is read in large
+    line-aligned blocks and the output is written as soon as the next block in order is done.
+    At most a few blocks per worker are in flight, so memory stays bounded for any input size.
+    """
+    timer = timer or StageTimer()
+    file_size = os.path.getsize(input_path)
+    if block_bytes is None:
+        # enough blocks to keep every worker busy, capped so memory stays small on huge files
+        block_bytes = min(4 << 20, max(64 << 10, file_size // (workers * 4 or 1)))
+
+    with timer.stage('compile'):
+        get_matcher(engine, pattern_str, mapping)
+    init_args = (engine, pattern_str, mapping, cache_path)
+    if timer.measure_ipc:
+        _record_ipc(timer, init_args, file_size, -(-file_size // block_bytes), workers)
+
+    total_replacements = 0
+    max_in_flight = workers * 2
+    discard_incremental_state(output_path)
+    with timer.stage('replace (streamed read/write)'):
+        with _worker_pool(pool, workers, init_args) as p, \
+                open(output_path, 'w', encoding='utf-8') as out, \
+                tqdm(total=file_size, unit='B', unit_scale=True, desc="Processing blocks") as bar:
+            pending = deque()
+            for block, raw_size in iter_text_blocks(input_path, block_bytes):
+                timer.chars += len(block)
+                pending.append((p.apply_async(replace_in_line_worker, (block,)), raw_size))
+                # write finished blocks in order; wait on the oldest once the window is full
+                while pending and (len(pending) >= max_in_flight or pending[0][0].ready()):
+                    result, size = pending.popleft()
+                    new_block, count, hits = result.get()
+                    out.write(new_block)
+                    total_replacements += count
+                    timer.add_hits(hits)
+                    bar.update(size)
+            while pending:
+                result, size = pending.popleft()
+                new_block, count, hits = result.get()
+                out.write(new_block)
+                total_replacements += count
+                timer.add_hits(hits)
+                bar.update(size)
+
+    return total_replacements
+
+# -------------------------
+# Incremental re-runs (only what the glossary change can affect is replaced again)
+# -------------------------
+INCREMENTAL_STATE_VERSION = 2
+
+def incremental_state_path(output_path: str) -> str:
+    return output_path + '.incremental.json'
+
+def _unit_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def load_incremental_state(output_path: str, kind: str) -> Dict[str,Any]:
+    """
+    State of the last run that wrote output_path, or None when there is none usable
+    (no previous output, no state file, unreadable state, other file type or version, or an
+    output that is no longer the one the state was saved with).
+    """
+    state_path = incremental_state_path(output_path)
+    if not (os.path.exists(output_path) and os.path.exists(state_path)):
+        return None
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get('version') != INCREMENTAL_STATE_VERSION or state.get('kind') != kind:
+        return None
+    if not isinstance(state.get('glossary'), dict) or not isinstance(state.get('units'), list):
+        return None
+    # output edited, or replaced by another run that left this state behind
+    if state.get('output_sha256') != _file_sha256(output_path):
+        return None
+    return state
+
+def discard_incremental_state(output_path: str):
+    """
+    Called by every run that is not incremental before it writes output_path: the state of an
+    earlier incremental run no longer describes that output and must not be trusted next time.
+    """
+    try:
+        os.remove(incremental_state_path(output_path))
+    except FileNotFoundError:
+        pass
+
+def save_incremental_state(output_path: str, kind: str, mapping: Dict[str,str], units: List[List[Any]]):
+    # units: [input hash, sorted matched keys] per line / body element, in order
+    state_path = incremental_state_path(output_path)
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': INCREMENTAL_STATE_VERSION, 'kind': kind, 'output_sha256': _file_sha256(output_path),
+                   'glossary': mapping, 'units': units}, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+class IncrementalPlan(object):
+    """
+    Decides which units (lines / body elements) must be replaced again after the glossary changed.
+    A unit is dirty when its input changed, when a key that matched in it last time was changed
+    or removed, or when its text contains a newly added key. Everything else is copied from the
+    previous output. Without a previous state every unit is dirty.
+    """
+    def __init__(self, state: Dict[str,Any], mapping: Dict[str,str]):
+        self.full = state is None
+        self.units: List[List[Any]] = state['units'] if state else []
+        old = state['glossary'] if state else {}
+        # changed or removed keys
+        self.changed = {k for k, v in old.items() if mapping.get(k) != v}
+        added = [k for k in mapping if k not in old] if state else []
+        self.added_count = len(added)
+        # any occurrence of any added key shows up as at least one leftmost match
+        self.added_matcher = AhoCorasickMatcher(added) if added else None
+
+    def is_dirty(self, idx: int, text: str, text_hash: str) -> bool:
+        if self.full or idx >= len(self.units):
+            return True
+        old_hash, old_keys = self.units[idx]
+        if old_hash != text_hash:
+            return True
+        if self.changed and any(k in self.changed for k in old_keys):
+            return True
+        if self.added_matcher is not None and next(self.added_matcher.spans(text), None) is not None:
+            return True
+        return False
+
+    def describe(self) -> str:
+        if self.full:
+            return "no previous state, full run"
+        return f"{self.added_count} key(s) added, {len(self.changed)} changed or removed"
+
+def replace_lines_worker(lines: List[str]):
+    """
+    Worker for incremental .txt: a block of lines, replaced one by one because the matched
+    keys are remembered per line. Returns [(new_line, count, {key: hits}) per line].
+    """
+    return [replace_in_line_worker(line) for line in lines]
+
+def process_txt_incremental(input_path: str, output_path: str, pattern_str: str, mapping: Dict[str,str], workers:int, engine: str = 'regex', timer: StageTimer = None, cache_path: str = None, block_bytes: int = None, pool=None) -> int:
+    """
+    Same result as process_txt, but remembers per line the input hash and the glossary keys that
+    matched (<output>.incremental.json). On the next run only dirty lines (see IncrementalPlan)
+    are replaced again; the rest are copied from the previous output.
+    Input and previous output are streamed like process_txt_blocks: lines are taken in blocks of
+    about block_bytes characters, the dirty ones of a block go to the workers as one task and the
+    new output is written in order as blocks come back, so apart from the per-line state memory
+    stays bounded.
+    Returns the number of replacements made in this run.
+    """
+    timer = timer or StageTimer()
+    file_size = os.path.getsize(input_path)
+    if block_bytes is None:
+        block_bytes = min(4 << 20, max(64 << 10, file_size // (workers * 4 or 1)))
+
+    with timer.stage('plan'):
+        state = load_incremental_state(output_path, 'txt')
+        plan = IncrementalPlan(state, mapping)
+
+    with timer.stage('compile'):
+        get_matcher(engine, pattern_str, mapping)
+    init_args = (engine, pattern_str, mapping, cache_path)
+    if timer.measure_ipc:
+        timer.count('ipc: initializer bytes (all workers, spawn only)', len(pickle.dumps(init_args)) * workers)
+
+    units: List[List[Any]] = []
+    total_lines = 0
+    total_chars = 0
+    dirty_count = 0
+    total_replacements = 0
+    max_in_flight = workers * 2
+    # the previous output is read while the new one is written
+    target_path = output_path + '.tmp'
+    with timer.stage('replace (streamed read/write)'):
+        with _worker_pool(pool, workers, init_args) as p, \
+                open(input_path, 'r', encoding='utf-8') as src, \
+                open(target_path, 'w', encoding='utf-8') as out, \
+                tqdm(desc="Processing lines", unit="line") as bar:
+            previous = open(output_path, 'r', encoding='utf-8') if state is not None else None
+            pending = deque()
+            # the block being filled: output lines (None until replaced), their units, and the dirty lines
+            block_lines: List[str] = []
+            block_units: List[List[Any]] = []
+            dirty_lines: List[str] = []
+            dirty_pos: List[int] = []
+            block_chars = 0
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.writelines(replaced_lines)
+            def submit():
+                nonlocal block_chars, dirty_count
+                result = None
+                if dirty_lines:
+                    if timer.measure_ipc:
+                        timer.count('ipc: task bytes', len(pickle.dumps(dirty_lines)))
+                    timer.chars += sum(len(line) for line in dirty_lines)
+                    dirty_count += len(dirty_lines)
+                    result = p.apply_async(replace_lines_worker, (list(dirty_lines),))
+                pending.append((list(block_lines), list(block_units), list(dirty_pos), result))
+                block_lines.clear()
+                block_units.clear()
+                dirty_lines.clear()
+                dirty_pos.clear()
+                block_chars = 0
+
+            def flush(wait_all: bool):
+                nonlocal total_replacements
+                while pending and (wait_all or len(pending) >= max_in_flight or pending[0][3] is None or pending[0][3].ready()):
+                    lines_out, units_out, positions, result = pending.popleft()
+                    if result is not None:
+                        for pos, (new_line, count, hits) in zip(positions, result.get()):
+                            lines_out[pos] = new_line
+                            units_out[pos][1] = sorted(hits)
+                            total_replacements += count
+                            timer.add_hits(hits)
+                    out.writelines(lines_out)
+                    units.extend(units_out)
+                    bar.update(len(lines_out))
+
+            try:
+                for i, line in enumerate(src):
+                    previous_line = previous.readline() if previous is not None else None
+                    total_lines += 1
+                    total_chars += len(line)
+                    block_chars += len(line)
+                    line_hash = _unit_hash(line)
+                    if plan.is_dirty(i, line, line_hash):
+                        dirty_pos.append(len(block_lines))
+                        dirty_lines.append(line)
+                        block_lines.append(None)
+                        block_units.append([line_hash, None])
+                    else:
+                        keys = plan.units[i][1]
+                        block_lines.append(previous_line)
+                        block_units.append([line_hash, keys])
+                        timer.reused_keys.update(keys)
+                    if block_chars >= block_bytes:
+                        submit()
+                        flush(False)
+                submit()
+                flush(True)
+            finally:
+                if previous is not None:
+                    previous.close()
+
+    with timer.stage('write'):
+        os.replace(target_path, output_path)
+        save_incremental_state(output_path, 'txt', mapping, units)
+    print(f"Incremental: {dirty_count} of {total_lines} lines replaced again ({plan.describe()})")
+    timer.count_incremental('lines', total_lines, dirty_count, total_chars)
 
     return total_replacements
 
@@ -146,116 +868,101 @@ def paragraph_to_serial_fast(paragraph) -> Dict[str, Any]:
     full_text = ''.join(r['text'] for r in runs_info)
     return {'runs': runs_info, 'text': full_text}
 
-def process_paragraph_serial_worker(args: Tuple[int, Dict[str,Any], str, Dict[str,str]]):
+def _run_style(r: Dict[str,Any]) -> Dict[str,Any]:
+    # copy whatever style keys exist in run info
+    return {
+        'bold': r.get('bold'),
+        'italic': r.get('italic'),
+        'underline': r.get('underline'),
+        'style': r.get('style'),
+        'font_name': r.get('font_name') if 'font_name' in r else None,
+        'font_size': r.get('font_size') if 'font_size' in r else None,
+        'font_color': r.get('font_color') if 'font_color' in r else None,
+    }
+
+def rebuild_paragraph_runs(serial: Dict[str,Any], pattern, mapping: Dict[str,str], hits: Dict[str,int] = None) -> Tuple[List[Tuple[str, Dict[str,Any]]], int]:
     """
-    Worker for paragraphs. Receives (idx, serial_dict, pattern_str, mapping).
-    Recompile regex and perform replacements on serial_dict['text'].
-    Return (idx, rebuilt_chunks_list, replacements_count)
-    rebuilt_chunks_list = [(text, style_dict), ...] where style_dict contains the serialization's style fields.
+    Perform replacements on serial['text'] and map the result back onto the original runs.
+    Runs are tracked as an offset array (start offset of every non-empty run), so each match
+    finds its run with one bisect instead of walking a per-character style list.
+    Returns (rebuilt_chunks, replacements_count); rebuilt_chunks is None when nothing matched,
+    so the paragraph can be left untouched. Per-key match counts are added to hits when it is given.
     """
-    idx, serial, pattern_str, mapping = args
-    pattern = re.compile(pattern_str)
     full_text: str = serial['text']
     runs_info = serial['runs']
 
     if not full_text:
-        return idx, [], 0
-
-    # Build per-character style mapping
-    char_styles = []
-    for run_idx, r in enumerate(runs_info):
-        style = {
-            # copy whatever style keys exist in run info
-            'bold': r.get('bold'),
-            'italic': r.get('italic'),
-            'underline': r.get('underline'),
-            'style': r.get('style'),
-            'font_name': r.get('font_name') if 'font_name' in r else None,
-            'font_size': r.get('font_size') if 'font_size' in r else None,
-            'font_color': r.get('font_color') if 'font_color' in r else None,
-        }
-        for _ in r['text']:
-            char_styles.append(style)
-
-    def style_for_index(i: int) -> Dict[str,Any]:
-        if 0 <= i < len(char_styles):
-            return char_styles[i]
-        else:
-            # fallback
-            return {'bold': None, 'italic': None, 'underline': None, 'style': None, 'font_name': None, 'font_size': None, 'font_color': None}
+        return None, 0
 
     matches = list(pattern.finditer(full_text))
     if not matches:
-        # no change: return original runs as chunks
-        rebuilt = []
-        for r in runs_info:
-            rebuilt.append((r['text'], {
-                'bold': r.get('bold'),
-                'italic': r.get('italic'),
-                'underline': r.get('underline'),
-                'style': r.get('style'),
-                'font_name': r.get('font_name') if 'font_name' in r else None,
-                'font_size': r.get('font_size') if 'font_size' in r else None,
-                'font_color': r.get('font_color') if 'font_color' in r else None,
-            }))
-        return idx, rebuilt, 0
+        return None, 0
+
+    # offset-array representation of the runs (empty runs cover no characters)
+    run_starts: List[int] = []
+    run_ends: List[int] = []
+    run_styles: List[Dict[str,Any]] = []
+    offset = 0
+    for r in runs_info:
+        length = len(r['text'])
+        if length:
+            run_starts.append(offset)
+            run_ends.append(offset + length)
+            run_styles.append(_run_style(r))
+            offset += length
 
     rebuilt_chunks = []
+
+    def add_span(a: int, b: int):
+        # split full_text[a:b] at run boundaries, one chunk per run it touches
+        ri = bisect_right(run_starts, a) - 1
+        while a < b:
+            end = min(b, run_ends[ri])
+            rebuilt_chunks.append((full_text[a:end], run_styles[ri]))
+            a = end
+            ri += 1
+
     pos = 0
     replacements_count = 0
-
     for m in matches:
         s, e = m.start(), m.end()
         if s > pos:
-            before_text = full_text[pos:s]
-            # split by style changes
-            run_start = 0
-            while run_start < len(before_text):
-                abs_i = pos + run_start
-                cur_style = style_for_index(abs_i)
-                seg_len = 1
-                while run_start + seg_len < len(before_text):
-                    if style_for_index(pos + run_start + seg_len) == cur_style:
-                        seg_len += 1
-                    else:
-                        break
-                rebuilt_chunks.append((before_text[run_start:run_start+seg_len], cur_style))
-                run_start += seg_len
-
+            add_span(pos, s)
         key = m.group(0)
+        if hits is not None:
+            hits[key] = hits.get(key, 0) + 1
         repl_text = ' ' + mapping.get(key, key) + ' '
-        repl_style = style_for_index(s)
-        rebuilt_chunks.append((repl_text, repl_style))
+        rebuilt_chunks.append((repl_text, run_styles[bisect_right(run_starts, s) - 1]))
         replacements_count += 1
         pos = e
 
     # tail
     if pos < len(full_text):
-        tail_text = full_text[pos:]
-        run_start = 0
-        while run_start < len(tail_text):
-            abs_i = pos + run_start
-            cur_style = style_for_index(abs_i)
-            seg_len = 1
-            while run_start + seg_len < len(tail_text):
-                if style_for_index(pos + run_start + seg_len) == cur_style:
-                    seg_len += 1
-                else:
-                    break
-            rebuilt_chunks.append((tail_text[run_start:run_start+seg_len], cur_style))
-            run_start += seg_len
+        add_span(pos, len(full_text))
 
     # merge adjacent chunks with identical style
     merged = []
-    for t, s in rebuilt_chunks:
+    for t, st in rebuilt_chunks:
         if not t:
             continue
-        if merged and merged[-1][1] == s:
-            merged[-1] = (merged[-1][0] + t, s)
+        if merged and merged[-1][1] == st:
+            merged[-1] = (merged[-1][0] + t, st)
         else:
-            merged.append((t, s))
+            merged.append((t, st))
+
+    return merged, replacements_count
 
-    return idx, merged, replacements_count
+def process_paragraph_serial_worker(args: Tuple[int, Dict[str,Any]]):
+    """
+    Worker for paragraphs. Receives (idx, serial_dict); matcher and mapping come from init_replacement_worker.
+    Return (idx, rebuilt_chunks_list, replacements_count, {key: hits})
+    rebuilt_chunks_list = [(text, style_dict), ...] where style_dict contains the serialization's style fields,
+    or None when the paragraph has no replacements.
+    """
+    idx, serial = args
+    hits: Dict[str,int] = {}
+    rebuilt, count = rebuild_paragraph_runs(serial, _worker_matcher, _worker_mapping, hits)
+    return idx, rebuilt, count, hits
 
 # -------------------------
 # Apply rebuilt runs to docx paragraph
@@ -303,32 +1010,44 @@ def _apply_style_to_run(run, style: Dict[str,Any]):
     except Exception:
         pass
 
-def apply_rebuilt_runs_to_paragraph(paragraph, rebuilt_chunks: List[Tuple[str, Dict[str,Any]]]):
-    # attempt to reuse existing runs where possible
+def apply_rebuilt_runs_to_paragraph(paragraph, rebuilt_chunks: List[Tuple[str, Dict[str,Any]]], original_runs: List[Dict[str,Any]] = None) -> int:
+    """
+    Reuse existing runs where possible. With original_runs (the paragraph's serialized runs),
+    a run whose text and style already equal its chunk is left alone.
+    Returns the number of runs written.
+    """
     existing_runs = paragraph.runs
-    # clear existing runs' text
-    for r in existing_runs:
-        r.text = ''
-    idx = 0
-    for chunk_text, style in rebuilt_chunks:
+    written = 0
+    for idx, (chunk_text, style) in enumerate(rebuilt_chunks):
         if idx < len(existing_runs):
+            if original_runs is not None and idx < len(original_runs) \
+                    and original_runs[idx]['text'] == chunk_text and _run_style(original_runs[idx]) == style:
+                continue
             r = existing_runs[idx]
             r.text = chunk_text
             _apply_style_to_run(r, style)
         else:
             r = paragraph.add_run(chunk_text)
             _apply_style_to_run(r, style)
-        idx += 1
+        written += 1
+    # leftover runs keep their formatting but no text
+    for r in existing_runs[len(rebuilt_chunks):]:
+        if r.text:
+            r.text = ''
+            written += 1
+    return written
 
 # -------------------------
 # DOCX processing orchestration
 # -------------------------
-def process_docx(input_path: str, output_path: str, pattern_str: str, mapping: Dict[str,str], workers:int, fast_serialize: bool) -> int:
+def process_docx(input_path: str, output_path: str, pattern_str: str, mapping: Dict[str,str], workers:int, fast_serialize: bool, engine: str = 'regex', timer: StageTimer = None, cache_path: str = None, pool=None) -> int:
     if Document is None:
         raise RuntimeError("python-docx not installed. Install with: pip install python-docx")
 
+    timer = timer or StageTimer()
     print("Opening document and starting to serialize paragraphs...")  # immediate feedback
-    doc = Document(input_path)
+    with timer.stage('open'):
+        doc = Document(input_path)
 
     all_paragraphs = []
     # collect top-level paragraphs
@@ -342,6 +1061,7 @@ def process_docx(input_path: str, output_path: str, pattern_str: str, mapping: D
                     all_paragraphs.append(paragraph)
 
     total_paras = len(all_paragraphs)
+    discard_incremental_state(output_path)
     if total_paras == 0:
         doc.save(output_path)
         return 0
@@ -350,34 +1070,528 @@ def process_docx(input_path: str, output_path: str, pattern_str: str, mapping: D
     serials = []
     desc = "Serializing paragraphs (fast)" if fast_serialize else "Serializing paragraphs (full)"
     serializer = paragraph_to_serial_fast if fast_serialize else paragraph_to_serial
-    for p in tqdm(all_paragraphs, desc=desc, unit="para"):
-        serials.append(serializer(p))
+    with timer.stage('serialize'):
+        for p in tqdm(all_paragraphs, desc=desc, unit="para"):
+            serials.append(serializer(p))
+    timer.chars += sum(len(s['text']) for s in serials)
 
-    # prepare args for workers
-    args = [(idx, serials[idx], pattern_str, mapping) for idx in range(len(serials))]
+    # build in the parent first: forked workers inherit it instead of compiling again
+    with timer.stage('compile'):
+        get_matcher(engine, pattern_str, mapping)
+    init_args = (engine, pattern_str, mapping, cache_path)
+
+    # prepare args for workers (text + run info only)
+    args = list(enumerate(serials))
     results = [None] * len(args)
     total_replacements = 0
+    if timer.measure_ipc:
+        _record_ipc(timer, init_args, len(pickle.dumps(args)), len(args), workers)
 
     # choose chunksize heuristically
     chunksize = max(1, min(200, len(args) // (workers * 2 + 1)))
 
-    with Pool(processes=workers) as pool:
-        for idx, rebuilt, count in tqdm(pool.imap_unordered(process_paragraph_serial_worker, args, chunksize=chunksize),
-                                        total=len(args),
-                                        desc="Processing paragraphs (replacing)"):
-            results[idx] = (rebuilt, count)
-            total_replacements += count
+    with timer.stage('replace'):
+        with _worker_pool(pool, workers, init_args) as active_pool:
+            for idx, rebuilt, count, hits in tqdm(active_pool.imap_unordered(process_paragraph_serial_worker, args, chunksize=chunksize),
+                                                  total=len(args),
+                                                  desc="Processing paragraphs (replacing)"):
+                results[idx] = (rebuilt, count)
+                total_replacements += count
+                if hits:
+                    timer.add_hits(hits)
 
     # apply rebuilt runs back into doc (main process)
-    for paragraph, (rebuilt, _) in zip(all_paragraphs, results):
-        if rebuilt is None:
+    touched = 0
+    runs_written = 0
+    with timer.stage('apply'):
+        for paragraph, serial, (rebuilt, _) in zip(all_paragraphs, serials, results):
+            if rebuilt is None:
+                continue
+            runs_written += apply_rebuilt_runs_to_paragraph(paragraph, rebuilt, serial['runs'])
+            touched += 1
+    timer.count('paragraphs touched', touched)
+    timer.count('paragraphs skipped', total_paras - touched)
+    timer.count('runs rewritten', runs_written)
+    print(f"Paragraphs touched: {touched}, skipped (no replacements): {total_paras - touched}, runs rewritten: {runs_written}")
+
+    with timer.stage('save'):
+        doc.save(output_path)
+    return total_replacements
+
+# -------------------------
+# DOCX processing straight on word/document.xml (no python-docx objects)
+# -------------------------
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W_P = f'{{{W_NS}}}p'
+W_R = f'{{{W_NS}}}r'
+W_T = f'{{{W_NS}}}t'
+# run content that reads as a character (what python-docx puts in run.text for it); any other run
+# content (drawings, field codes, symbols, notes...) separates the text around it with RUN_BOUNDARY
+RUN_SEPARATORS = {f'{{{W_NS}}}br': '\n', f'{{{W_NS}}}cr': '\n', f'{{{W_NS}}}tab': '\t', f'{{{W_NS}}}ptab': '\t',
+                  f'{{{W_NS}}}noBreakHyphen': '-'}
+RUN_BOUNDARY = '\x00'
+# run children that are neither text nor a boundary (formatting, layout hints Word adds anywhere)
+RUN_IGNORED = {f'{{{W_NS}}}rPr', f'{{{W_NS}}}lastRenderedPageBreak'}
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+DOCX_BODY_PART = 'word/document.xml'
+
+def replace_across_texts(texts: List[str], pattern, mapping: Dict[str,str], hits: Dict[str,int] = None) -> Tuple[List[str], int]:
+    """
+    Replace on the concatenation of a paragraph's <w:t> texts and split the result back onto them.
+    Each replacement lands in the <w:t> where its match starts; matched characters in following
+    <w:t>s are dropped. Breaks, tabs and other run content come in as their separator character
+    (see _node_text), so no match can span them. Returns (new_texts, count), or (None, 0) when nothing matched.
+    Per-key match counts are added to hits when it is given.
+    """
+    full_text = ''.join(texts)
+    if not full_text:
+        return None, 0
+    matches = list(pattern.finditer(full_text))
+    if not matches:
+        return None, 0
+
+    starts: List[int] = []
+    ends: List[int] = []
+    offset = 0
+    for t in texts:
+        starts.append(offset)
+        offset += len(t)
+        ends.append(offset)
+    pieces: List[List[str]] = [[] for _ in texts]
+
+    def add_span(a: int, b: int):
+        ti = bisect_right(starts, a) - 1
+        while a < b:
+            end = min(b, ends[ti])
+            if end > a:
+                pieces[ti].append(full_text[a:end])
+            a = end
+            ti += 1
+
+    pos = 0
+    for m in matches:
+        s, e = m.start(), m.end()
+        if s > pos:
+            add_span(pos, s)
+        key = m.group(0)
+        if hits is not None:
+            hits[key] = hits.get(key, 0) + 1
+        pieces[bisect_right(starts, s) - 1].append(' ' + mapping.get(key, key) + ' ')
+        pos = e
+    if pos < len(full_text):
+        add_span(pos, len(full_text))
+    return [''.join(p) for p in pieces], len(matches)
+
+def replace_text_batch_worker(batch: List[List[str]]):
+    """
+    Worker for the document.xml engine: receives the <w:t> texts of a batch of paragraphs.
+    Returns ([new_texts or None per paragraph], count, [{key: hits} per paragraph])
+    """
+    results = []
+    hits_batch = []
+    total = 0
+    for texts in batch:
+        hits: Dict[str,int] = {}
+        new_texts, count = replace_across_texts(texts, _worker_matcher, _worker_mapping, hits)
+        results.append(new_texts)
+        hits_batch.append(hits)
+        total += count
+    return results, total, hits_batch
+
+def _paragraph_text_nodes(p) -> List[Any]:
+    # run content of this paragraph only (text boxes nest their own <w:p> inside runs): <w:t> nodes
+    # and the breaks, tabs etc. between them
+    nodes = []
+    for r in p.iter(W_R):
+        owner = r.getparent()
+        while owner is not None and owner.tag != W_P:
+            owner = owner.getparent()
+        if owner is p:
+            nodes.extend(child for child in r if child.tag not in RUN_IGNORED)
+    return nodes
+
+def _node_text(node) -> str:
+    if node.tag == W_T:
+        return node.text or ''
+    return RUN_SEPARATORS.get(node.tag, RUN_BOUNDARY)
+
+def _collect_batch_texts(elements) -> Tuple[List[List[Any]], List[List[str]], List[int]]:
+    # also returns how many paragraphs each element contributed
+    nodes_batch = []
+    texts_batch = []
+    per_element = []
+    for elem in elements:
+        before = len(nodes_batch)
+        for p in elem.iter(W_P):
+            nodes = _paragraph_text_nodes(p)
+            if any(t.tag == W_T for t in nodes):
+                nodes_batch.append(nodes)
+                texts_batch.append([_node_text(t) for t in nodes])
+        per_element.append(len(nodes_batch) - before)
+    return nodes_batch, texts_batch, per_element
+
+def _element_chars(elem) -> int:
+    # characters the matcher would scan for this element (what submit counts for dirty ones)
+    return sum(len(t) for texts in _collect_batch_texts([elem])[1] for t in texts)
+
+def _element_search_text(elem) -> str:
+    # paragraph texts joined with a separator no glossary key contains
+    return '\x00'.join(''.join(_node_text(t) for t in _paragraph_text_nodes(p)) for p in elem.iter(W_P))
+
+def _iter_body_children(docx_path: str):
+    """
+    Stream the serialized <w:body> children of a .docx (same order and namespace handling as process_docx_xml writes them).
+    """
+    with zipfile.ZipFile(docx_path) as z, z.open(DOCX_BODY_PART) as src:
+        declarations: List[bytes] = []
+        depth = 0
+        for event, elem in etree.iterparse(src, events=('start', 'end'), huge_tree=True):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    declarations = _ns_declarations(elem.nsmap)
+                continue
+            if depth == 3:
+                yield _strip_declarations(etree.tostring(elem, encoding='UTF-8'), declarations)
+                elem.getparent().remove(elem)
+            depth -= 1
+
+def _apply_batch_texts(nodes_batch: List[List[Any]], new_texts_batch: List[List[str]]) -> int:
+    # returns how many paragraphs were changed; the others are not touched at all
+    touched = 0
+    for nodes, new_texts in zip(nodes_batch, new_texts_batch):
+        if new_texts is None:
             continue
-        clear_paragraph_runs(paragraph)
-        apply_rebuilt_runs_to_paragraph(paragraph, rebuilt)
+        touched += 1
+        for t, new_text in zip(nodes, new_texts):
+            if t.tag != W_T:
+                # separators are never part of a match and come back unchanged
+                continue
+            if t.text != new_text and (t.text or new_text):
+                # None keeps emptied nodes serialized as <w:t/>, the same as after a re-parse
+                t.text = new_text or None
+                if new_text:
+                    # replacements add spaces at the edges, which Word drops unless told to keep them
+                    t.set(XML_SPACE, 'preserve')
+    return touched
+
+def _ns_declarations(nsmap: Dict[Any,str]) -> List[bytes]:
+    return [(f' xmlns:{prefix}="{uri}"' if prefix else f' xmlns="{uri}"').encode('utf-8') for prefix, uri in nsmap.items()]
+
+def _strip_declarations(raw: bytes, declarations: List[bytes]) -> bytes:
+    # lxml repeats every in-scope xmlns on a serialized subtree; the root already declares them
+    head_end = raw.index(b'>')
+    head = raw[:head_end]
+    for decl in declarations:
+        head = head.replace(decl, b'', 1)
+    return head + raw[head_end:]
+
+def _open_tag(elem, declarations: List[bytes]) -> Tuple[bytes, bytes]:
+    # (start tag, end tag) of a container element whose children are streamed separately
+    shell = etree.Element(elem.tag, attrib=dict(elem.attrib), nsmap=elem.nsmap)
+    raw = etree.tostring(shell, encoding='UTF-8')
+    start = _strip_declarations(raw[:-2] + b'>', declarations)
+    local = etree.QName(elem).localname
+    name = f"{elem.prefix}:{local}" if elem.prefix else local
+    return start, f"</{name}>".encode('utf-8')
+
+def process_docx_xml(input_path: str, output_path: str, pattern_str: str, mapping: Dict[str,str], workers:int, engine: str = 'regex', timer: StageTimer = None, cache_path: str = None, batch_size: int = 200, incremental: bool = False, pool=None) -> int:
+    """
+    Stream word/document.xml out of the .docx with lxml iterparse, rewrite only <w:t> text
+    (<w:rPr> and every other node are left exactly as they were), and write the new zip.
+    Body children are sent to the workers in batches and written back in order, so only a
+    window of batches is ever held in memory. Other zip members are copied unchanged.
+    With incremental=True, body children not affected by glossary changes since the last
+    run are copied from the previous output instead (see IncrementalPlan).
+    """
+    if etree is None:
+        raise RuntimeError("lxml not installed. Install with: pip install lxml")
+    timer = timer or StageTimer()
 
-    doc.save(output_path)
+    with timer.stage('compile'):
+        get_matcher(engine, pattern_str, mapping)
+    init_args = (engine, pattern_str, mapping, cache_path)
+    if timer.measure_ipc:
+        timer.count('ipc: initializer bytes (all workers, spawn only)', len(pickle.dumps(init_args)) * workers)
+
+    plan = None
+    previous_children = None
+    units: List[List[Any]] = []
+    if incremental:
+        with timer.stage('plan'):
+            state = load_incremental_state(output_path, 'docx-xml')
+            plan = IncrementalPlan(state, mapping)
+            if state is not None:
+                previous_children = _iter_body_children(output_path)
+        # the previous output is read while the new one is written
+        target_path = output_path + '.tmp'
+    else:
+        discard_incremental_state(output_path)
+        target_path = output_path
+
+    total_replacements = 0
+    paragraphs = 0
+    touched = 0
+    reused = 0
+    reused_chars = 0
+    max_in_flight = workers * 2
+
+    with timer.stage('replace (streamed document.xml)'):
+        with zipfile.ZipFile(input_path) as zin, \
+                zipfile.ZipFile(target_path, 'w', zipfile.ZIP_DEFLATED) as zout, \
+                _worker_pool(pool, workers, init_args) as active_pool:
+            for info in zin.infolist():
+                if info.filename != DOCX_BODY_PART:
+                    with zin.open(info) as src, zout.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst, 1 << 20)
+                    continue
+
+                out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                out_info.compress_type = zipfile.ZIP_DEFLATED
+                with zin.open(info) as src, zout.open(out_info, 'w') as dst, \
+                        tqdm(desc="Processing paragraphs (document.xml)", unit="para") as bar:
+                    dst.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n')
+                    root_declarations: List[bytes] = []
+                    end_tags: List[bytes] = []
+                    pending = deque()
+                    # (element, unit hash, previous output bytes to reuse, previous matched keys)
+                    batch = []
+
+                    def submit():
+                        dirty = [elem for elem, _, reuse, _ in batch if reuse is None]
+                        nodes_batch, texts_batch, per_element = _collect_batch_texts(dirty)
+                        if timer.measure_ipc:
+                            timer.count('ipc: task bytes', len(pickle.dumps(texts_batch)))
+                        timer.chars += sum(len(t) for texts in texts_batch for t in texts)
+                        pending.append((list(batch), nodes_batch, per_element, active_pool.apply_async(replace_text_batch_worker, (texts_batch,))))
+                        batch.clear()
+
+                    def flush(wait_all: bool):
+                        nonlocal total_replacements, paragraphs, touched, reused
+                        while pending and (wait_all or len(pending) >= max_in_flight or pending[0][3].ready()):
+                            entries, nodes_batch, per_element, result = pending.popleft()
+                            new_texts_batch, count, hits_batch = result.get()
+                            touched += _apply_batch_texts(nodes_batch, new_texts_batch)
+                            for hits in hits_batch:
+                                if hits:
+                                    timer.add_hits(hits)
+                            para_pos = 0
+                            dirty_pos = 0
+                            for elem, unit_hash, reuse, reuse_keys in entries:
+                                if reuse is None:
+                                    dst.write(_strip_declarations(etree.tostring(elem, encoding='UTF-8'), root_declarations))
+                                    if plan is not None:
+                                        n = per_element[dirty_pos]
+                                        keys = set().union(*hits_batch[para_pos:para_pos + n])
+                                        units.append([unit_hash, sorted(keys)])
+                                        para_pos += n
+                                    dirty_pos += 1
+                                else:
+                                    dst.write(reuse)
+                                    units.append([unit_hash, reuse_keys])
+                                    timer.reused_keys.update(reuse_keys)
+                                    reused += 1
+                                # drop written children so the parsed tree does not grow
+                                elem.getparent().remove(elem)
+                            total_replacements += count
+                            paragraphs += len(nodes_batch)
+                            bar.update(len(nodes_batch))
+
+                    depth = 0
+                    unit_index = 0
+                    for event, elem in etree.iterparse(src, events=('start', 'end'), huge_tree=True):
+                        if event == 'start':
+                            depth += 1
+                            if depth <= 2:
+                                # <w:document> and <w:body> stay open; their children are written one by one
+                                if batch:
+                                    submit()
+                                flush(True)
+                                if depth == 1:
+                                    root_declarations = _ns_declarations(elem.nsmap)
+                                    start_tag, end_tag = _open_tag(elem, [])
+                                else:
+                                    start_tag, end_tag = _open_tag(elem, root_declarations)
+                                dst.write(start_tag)
+                                end_tags.append(end_tag)
+                            continue
+                        if depth == 3:
+                            unit_hash = reuse = reuse_keys = None
+                            if plan is not None:
+                                unit_hash = _unit_hash(etree.tostring(elem, encoding='unicode'))
+                                previous = next(previous_children, None) if previous_children is not None else None
+                                if previous is not None and not plan.is_dirty(unit_index, _element_search_text(elem), unit_hash):
+                                    reuse = previous
+                                    reuse_keys = plan.units[unit_index][1]
+                                    reused_chars += _element_chars(elem)
+                            batch.append((elem, unit_hash, reuse, reuse_keys))
+                            unit_index += 1
+                            if len(batch) >= batch_size:
+                                submit()
+                                flush(False)
+                        elif depth <= 2:
+                            if batch:
+                                submit()
+                            flush(True)
+                            dst.write(end_tags.pop())
+                        depth -= 1
+
+    if previous_children is not None:
+        previous_children.close()
+    if plan is not None:
+        os.replace(target_path, output_path)
+        save_incremental_state(output_path, 'docx-xml', mapping, units)
+        timer.count_incremental('body elements', len(units), len(units) - reused, timer.chars + reused_chars)
+        print(f"Incremental: {len(units) - reused} of {len(units)} body elements replaced again, {reused} reused "
+              f"({plan.describe()})")
+
+    timer.count('paragraphs touched', touched)
+    timer.count('paragraphs skipped', paragraphs - touched)
+    print(f"Paragraphs touched: {touched}, skipped (no replacements): {paragraphs - touched}")
     return total_replacements
 
+# -------------------------
+# Single file / batch orchestration
+# -------------------------
+def process_file(input_file: str, output_file: str, pattern: str, mapping: Dict[str,str], workers:int, engine: str, timer: StageTimer, cache_path: str = None,
+                 fast_serialize: bool = True, docx_engine: str = 'xml', txt_block_mode: bool = True, incremental: bool = False, pool=None) -> int:
+    """
+    Pick the processor for the file type and settings. Raises ValueError for unsupported file types.
+    """
+    ext = os.path.splitext(input_file)[1].lower()
+    if ext == '.txt':
+        if incremental:
+            txt_processor = process_txt_incremental
+        else:
+            txt_processor = process_txt_blocks if txt_block_mode else process_txt
+        return txt_processor(input_file, output_file, pattern, mapping, workers, engine, timer, cache_path, pool=pool)
+    if ext == '.docx':
+        if docx_engine == 'xml':
+            return process_docx_xml(input_file, output_file, pattern, mapping, workers, engine, timer, cache_path,
+                                    incremental=incremental, pool=pool)
+        if incremental:
+            print("Incremental mode needs the 'xml' .docx engine; doing a full run.")
+        return process_docx(input_file, output_file, pattern, mapping, workers, fast_serialize, engine, timer, cache_path, pool=pool)
+    raise ValueError("Unsupported input file type. Only .txt and .docx supported.")
+
+def load_batch_manifest(manifest_path: str) -> List[Dict[str,str]]:
+    """
+    Manifest is JSON: either a list of jobs or {"glossary": default, "jobs": [...]}.
+    Each job is {"input": ..., "output": ..., "glossary": ...}; "glossary" falls back to the default.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    default_glossary = None
+    if isinstance(data, dict):
+        default_glossary = data.get('glossary')
+        data = data.get('jobs', [])
+    jobs = []
+    for n, job in enumerate(data, 1):
+        job = dict(job)
+        job.setdefault('glossary', default_glossary)
+        missing = [k for k in ('input', 'output', 'glossary') if not job.get(k)]
+        if missing:
+            raise ValueError(f"Batch job #{n} in {manifest_path} is missing: {', '.join(missing)}")
+        jobs.append(job)
+    return jobs
+
+def batch_results_path(manifest_path: str) -> str:
+    return manifest_path + '.results.json'
+
+def _prefetch_file(path: str) -> int:
+    # read the file once and throw the data away: it is then in the OS page cache when its job
+    # starts, nothing is kept in this process
+    size = 0
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(8 << 20), b''):
+                size += len(block)
+    except OSError:
+        pass
+    return size
+
+def _job_failed(job: Dict[str,Any], stage: str, error: BaseException):
+    job['status'] = 'failed'
+    job['error'] = f"{stage}: {type(error).__name__}: {error}"
+    print(f"Job failed: {job['input']}: {job['error']}")
+
+def run_batch(jobs: List[Dict[str,str]], workers:int, engine: str, use_glossary_cache: bool = True, export_stats: bool = False,
+              measure_ipc: bool = False, results_path: str = None, **options) -> int:
+    """
+    Run many novels in one process. Jobs are grouped by glossary (in manifest order); each
+    glossary is loaded/compiled once and gets one long-lived worker pool shared by all its books.
+    While a book is being replaced the next book's input file is read once in a background thread,
+    which only warms the OS page cache for it.
+    options are passed to process_file (fast_serialize, docx_engine, txt_block_mode, incremental).
+    With export_stats every job's statistics are written to <output>.stats.json; measure_ipc adds IPC payload sizes.
+    A glossary that cannot be loaded fails its jobs, a job that raises (bad zip, broken XML, missing
+    file...) fails alone; the batch always goes on. Every job gets a 'status' ('ok' or 'failed'),
+    'replacements' or 'error', and the job list is written to results_path when it is given.
+    Returns the total number of replacements.
+    """
+    groups: Dict[str, List[Dict[str,str]]] = OrderedDict()
+    for job in jobs:
+        groups.setdefault(job['glossary'], []).append(job)
+    ordered = [job for group in groups.values() for job in group]
+
+    grand_total = 0
+    done = 0
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        for glossary, group in groups.items():
+            glossary_timer = StageTimer()
+            try:
+                with glossary_timer.stage('load glossary'):
+                    mapping, pattern, cache_path = load_compiled_glossary(glossary, engine, use_glossary_cache)
+                if not mapping:
+                    raise ValueError("no mappings loaded")
+                with glossary_timer.stage('compile'):
+                    get_matcher(engine, pattern, mapping)
+            except Exception as e:
+                print(f"Glossary {glossary} failed - skipping {len(group)} job(s)")
+                for job in group:
+                    _job_failed(job, 'glossary', e)
+                done += len(group)
+                continue
+            print(f"Loaded {len(mapping)} mappings from {glossary} for {len(group)} book(s). Using {workers} worker(s) with the {engine} matcher.")
+            glossary_timer.report()
+
+            init_args = (engine, pattern, mapping, cache_path)
+            with Pool(processes=workers, initializer=init_replacement_worker, initargs=init_args) as pool:
+                for job in group:
+                    if done + 1 < len(ordered):
+                        prefetcher.submit(_prefetch_file, ordered[done + 1]['input'])
+                    done += 1
+                    print(f"[{done}/{len(ordered)}] {job['input']} -> {job['output']}")
+                    timer = StageTimer(measure_ipc)
+                    try:
+                        total = process_file(job['input'], job['output'], pattern, mapping, workers, engine, timer, cache_path,
+                                             pool=pool, **options)
+                    except Exception as e:
+                        _job_failed(job, 'replace', e)
+                        continue
+                    grand_total += total
+                    job['status'] = 'ok'
+                    job['replacements'] = total
+                    print(f"Done. Total replacements made: {total}")
+                    timer.report(mapping)
+                    if export_stats:
+                        try:
+                            timer.export_json(replacement_stats_path(job['output']), mapping, input=job['input'], output=job['output'],
+                                              glossary=glossary, engine=engine)
+                        except OSError as e:
+                            print(f"Could not write statistics for {job['output']}: {e}")
+
+    failed = [job for job in ordered if job.get('status') == 'failed']
+    if results_path:
+        with open(results_path, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': ordered}, f, ensure_ascii=False, indent=1)
+    print(f"Batch finished: {len(ordered)} job(s), {len(failed)} failed, {grand_total} replacements in total.")
+    for job in failed:
+        print(f"  failed: {job['input']}: {job['error']}")
+    if results_path:
+        print(f"Job results written to: {results_path}")
+    return grand_total
+
 # -------------------------
 # Main
 # -------------------------
@@ -398,26 +1612,51 @@ if __name__ == "__main__":
     input_file = os.path.join(file_root, "input.docx")  # can be input.txt or input.docx
     output_file = os.path.join(file_root, "output.docx")  # .txt or .docx
     fast_serialize = True
+    # .docx only: 'xml' streams word/document.xml directly (fast, low memory), 'python-docx' rebuilds runs
+    docx_engine = "xml"
+    # 'regex' or 'aho-corasick' (much faster to build and scan with tens of thousands of keys)
+    engine = "aho-corasick"
+    # keep a compiled copy of the glossary next to it (<glossary>.<engine>.cache), rebuilt when the glossary changes
+    use_glossary_cache = True
+    # .txt only: process large line-aligned blocks streamed to disk instead of one task per line
+    txt_block_mode = True
+    # only replace again what glossary changes since the last run can affect (state kept in <output>.incremental.json);
+    # used for .txt (streamed in blocks like txt_block_mode) and the 'xml' .docx engine
+    incremental = True
     workers = max(1, cpu_count()-1)
+    # write per-key hit counts, dead glossary keys, stage timings and throughput to <output>.stats.json
+    export_stats = True
+    # also measure the bytes sent to the workers (pickles the whole input once more, for profiling only)
+    measure_ipc = False
+    # set to a manifest (see batch_jobs.json) to process many novels in one go; mapping_file/file_root are then ignored,
+    # what happened to each job is written to <manifest>.results.json
+    batch_manifest = None
+    # batch_manifest = "C:\\DATA\\Novels\\batch_jobs.json"
+
+    options = dict(fast_serialize=fast_serialize, docx_engine=docx_engine, txt_block_mode=txt_block_mode, incremental=incremental)
+    if batch_manifest:
+        run_batch(load_batch_manifest(batch_manifest), workers, engine, use_glossary_cache, export_stats, measure_ipc,
+                  batch_results_path(batch_manifest), **options)
+        sys.exit(0)
 
-    mapping = load_mappings(mapping_file)
+    timer = StageTimer(measure_ipc)
+    with timer.stage('load glossary'):
+        mapping, pattern, cache_path = load_compiled_glossary(mapping_file, engine, use_glossary_cache)
     if not mapping:
         print("No mappings loaded from", mapping_file)
         sys.exit(1)
 
-    pattern = build_pattern_string_from_keys(list(mapping.keys()))
-    ext = os.path.splitext(input_file)[1].lower()
-
-    print(f"Loaded {len(mapping)} mappings. Using {workers} worker(s).")
-    total_replacements = 0
-
-    if ext == '.txt':
-        total_replacements = process_txt(input_file, output_file, pattern, mapping, workers)
-    elif ext == '.docx':
-        total_replacements = process_docx(input_file, output_file, pattern, mapping, workers, fast_serialize)
-    else:
-        print("Unsupported input file type. Only .txt and .docx supported.")
+    print(f"Loaded {len(mapping)} mappings. Using {workers} worker(s) with the {engine} matcher.")
+    try:
+        total_replacements = process_file(input_file, output_file, pattern, mapping, workers, engine, timer, cache_path, **options)
+    except ValueError as e:
+        print(e)
         sys.exit(1)
 
     print(f"Done. Total replacements made: {total_replacements}")
-    print(f"Output written to: {output_file}")
\ No newline at end of file
+    print(f"Output written to: {output_file}")
+    timer.report(mapping)
+    if export_stats:
+        stats_file = replacement_stats_path(output_file)
+        timer.export_json(stats_file, mapping, input=input_file, output=output_file, glossary=mapping_file, engine=engine)
+        print(f"Statistics written to: {stats_file}")
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+test_docx_engines.py
+
+Tests of the .docx engines of chinese_text_replacement.py (run with python -m pytest).
+ - a small generated .docx with tabs, line breaks and multi-run paragraphs (keys split across runs)
+ - the 'xml' engine (process_docx_xml) and the python-docx engine (process_docx, full and fast
+   serialization) give the same paragraph text, run count and replacement count
+ - paragraphs without replacements are left exactly as they were by both engines
+"""
+import pytest
+from docx import Document
+
+import chinese_text_replacement as ctr
+
+MAPPING = {"中国": "China", "北京": "Beijing", "国": "country", "天地玄黄": "heaven and earth"}
+
+def make_docx(path):
+    doc = Document()
+    p = doc.add_paragraph()
+    r = p.add_run("中")
+    r.add_break()
+    r.add_text("国")
+    p = doc.add_paragraph()
+    r = p.add_run("中")
+    r.add_tab()
+    r.add_text("国在这")
+    # key split across runs with different formatting
+    p = doc.add_paragraph()
+    p.add_run("我在中")
+    p.add_run("国").bold = True
+    p.add_run("北").italic = True
+    p.add_run("京")
+    p = doc.add_paragraph()
+    r = p.add_run("我在中国")
+    r.add_break()
+    r.add_text("北京中")
+    p.add_run("国")
+    p = doc.add_paragraph()
+    r = p.add_run("天地\t玄黄")
+    r.add_tab()
+    p.add_run("天地").bold = True
+    p.add_run("玄黄")
+    # nothing to replace
+    p = doc.add_paragraph()
+    p.add_run("no keys here")
+    p.add_run("\tstill none").underline = True
+    doc.add_paragraph("")
+    doc.save(path)
+
+def paragraphs(path):
+    return [(p.text, len(p.runs)) for p in Document(path).paragraphs]
+
+@pytest.fixture(scope="module")
+def outputs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("docx")
+    input_path = str(directory / "input.docx")
+    make_docx(input_path)
+    pattern = ctr.build_pattern_string_from_keys(list(MAPPING))
+    results = {}
+    for name, process in [("xml", lambda i, o: ctr.process_docx_xml(i, o, pattern, MAPPING, 2, 'aho-corasick')),
+                          ("python-docx", lambda i, o: ctr.process_docx(i, o, pattern, MAPPING, 2, False, 'aho-corasick')),
+                          ("python-docx fast", lambda i, o: ctr.process_docx(i, o, pattern, MAPPING, 2, True, 'aho-corasick'))]:
+        output_path = str(directory / (name + ".docx"))
+        results[name] = (process(input_path, output_path), paragraphs(output_path))
+    return paragraphs(input_path), results
+
+@pytest.mark.parametrize("name", ["python-docx", "python-docx fast"])
+def test_same_paragraphs_as_xml_engine(outputs, name):
+    _, results = outputs
+    assert results[name] == results["xml"]
+
+def test_breaks_and_tabs_kept(outputs):
+    _, results = outputs
+    texts = [text for text, _ in results["xml"][1]]
+    # a break or tab ends a match: "中<br/>国" is not "中国"
+    assert texts[0] == "中\n country "
+    assert texts[1] == "中\t country 在这"
+    # but a run boundary does not: "中" + "国" in the next run is "中国"
+    assert texts[3] == "我在 China \n Beijing  China "
+    assert texts[4].count("\t") == 2
+
+def test_untouched_paragraphs(outputs):
+    original, results = outputs
+    for name in results:
+        assert results[name][1][-2:] == original[-2:]
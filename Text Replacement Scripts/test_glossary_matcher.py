@@ -0,0 +1,77 @@
+"""
+test_glossary_matcher.py
+
+Tests of the matcher engines of chinese_text_replacement.py (run with python -m pytest).
+ - the 'aho-corasick' engine finds exactly the leftmost-longest matches of the length-sorted 'regex' alternation
+ - on random glossaries with overlapping, prefix-sharing and suffix-sharing keys
+ - edge cases: empty glossary, single-character keys, a key that is a suffix (or prefix) of another
+ - both engines through get_matcher and the replacement worker give the same replaced text
+"""
+import random
+import re
+
+import pytest
+
+import chinese_text_replacement as ctr
+from chinese_text_replacement import AhoCorasickMatcher, build_pattern_string_from_keys
+
+# small alphabets, so random keys overlap and share prefixes and suffixes all the time
+ALPHABETS = ["ab", "abc", "天地玄黄", "天地玄黄宇宙洪荒"]
+
+def regex_spans(keys, text):
+    return [m.span() for m in re.compile(build_pattern_string_from_keys(keys)).finditer(text)]
+
+def ac_spans(keys, text):
+    return list(AhoCorasickMatcher(keys).spans(text))
+
+def replaced(engine, mapping, text):
+    # the same replacement the .txt worker makes
+    ctr.init_replacement_worker(engine, build_pattern_string_from_keys(list(mapping)), mapping)
+    return ctr.replace_in_line_worker(text)
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_glossaries(seed):
+    rng = random.Random(seed)
+    alphabet = ALPHABETS[seed % len(ALPHABETS)]
+    keys = list({"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 30))})
+    rng.shuffle(keys)
+    for _ in range(20):
+        text = "".join(rng.choice(alphabet + "。") for _ in range(rng.randint(0, 80)))
+        assert ac_spans(keys, text) == regex_spans(keys, text), (keys, text)
+
+@pytest.mark.parametrize("keys, text", [
+    ([], "天地玄黄"),
+    ([], ""),
+    (["天"], "天天地天"),
+    (["天"], ""),
+    (["地玄", "天地玄"], "天地玄黄地玄"),
+    (["玄黄", "黄"], "天地玄黄黄"),
+    (["天地", "天地玄黄"], "天地玄天地玄黄天地"),
+    (["天地玄黄", "地玄"], "天地玄地玄黄"),
+    (["ab", "b", "bc", "abc"], "abcbcab"),
+    (["aa", "a"], "aaaaa"),
+    (["aaa", "aa"], "aaaaa"),
+    (["天地", "地玄", "玄黄"], "天地玄黄"),
+    (["a.b", "(x)", "a"], "a.b axb (x)"),
+])
+def test_edge_cases(keys, text):
+    assert ac_spans(keys, text) == regex_spans(keys, text)
+
+def test_empty_glossary_changes_nothing():
+    for engine in ctr.MATCHER_ENGINES:
+        assert replaced(engine, {}, "天地玄黄\n") == ("天地玄黄\n", 0, {})
+
+def test_key_that_is_a_suffix_of_another():
+    mapping = {"黄": "yellow", "玄黄": "dark yellow"}
+    for engine in ctr.MATCHER_ENGINES:
+        assert replaced(engine, mapping, "天地玄黄黄") == ("天地 dark yellow  yellow ", 2, {"玄黄": 1, "黄": 1})
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engines_replace_the_same(seed):
+    rng = random.Random(seed)
+    alphabet = ALPHABETS[-1]
+    mapping = {}
+    while len(mapping) < 25:
+        mapping.setdefault("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))), "t" + str(len(mapping)))
+    text = "".join(rng.choice(alphabet + "，") for _ in range(500))
+    assert replaced('aho-corasick', mapping, text) == replaced('regex', mapping, text)
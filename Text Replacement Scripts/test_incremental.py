@@ -0,0 +1,212 @@
+"""
+test_incremental.py
+
+Tests of the incremental mode of chinese_text_replacement.py (run with python -m pytest).
+ - incremental .txt and .docx output is byte-identical to a full run with the same glossary
+ - after glossary keys are added, changed and removed, and after the input file is edited
+ - unaffected lines / body elements are copied from the previous output, not replaced again
+ - a corrupt, foreign or stale <output>.incremental.json, or an output edited since, means a full run
+"""
+import json
+import os
+import random
+import zipfile
+
+import pytest
+from docx import Document
+
+import chinese_text_replacement as ctr
+
+# few characters, so keys overlap, share prefixes and occur often
+ALPHABET = "天地玄黄宇宙洪荒日月盈昃辰宿列张"
+
+def make_glossary(rng, size):
+    glossary = {}
+    while len(glossary) < size:
+        key = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 4)))
+        glossary.setdefault(key, "w" + str(len(glossary)))
+    return glossary
+
+def make_lines(rng, count):
+    # plain text lines, with some empty ones and some that no key can match
+    lines = []
+    for number in range(count):
+        if number % 7 == 0:
+            lines.append("")
+        elif number % 5 == 0:
+            lines.append("第" + str(number) + "章 ok")
+        else:
+            lines.append("".join(rng.choice(ALPHABET + "，。") for _ in range(rng.randint(5, 60))))
+    return lines
+
+def glossary_versions():
+    rng = random.Random(8)
+    first = make_glossary(rng, 60)
+    second = dict(first)
+    for key in list(second)[:5]:
+        second[key] = "CHANGED"
+    for key in list(second)[5:10]:
+        del second[key]
+    second.update(make_glossary(random.Random(99), 8))
+    return first, second
+
+def write_txt(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+def write_docx(path, lines):
+    # two runs per paragraph, the second bold, so replacements cross run boundaries
+    doc = Document()
+    for line in lines:
+        p = doc.add_paragraph()
+        half = len(line) // 2
+        p.add_run(line[:half])
+        p.add_run(line[half:]).bold = True
+    doc.save(path)
+
+def run(tmp_path, input_path, output_name, mapping, incremental, timer=None):
+    output_path = str(tmp_path / output_name)
+    pattern = ctr.build_pattern_string_from_keys(list(mapping))
+    ctr.process_file(input_path, output_path, pattern, mapping, 2, 'aho-corasick', timer or ctr.StageTimer(),
+                     incremental=incremental)
+    return output_path
+
+def contents(path):
+    # a .docx is compared member by member (zip timestamps aside), a .txt byte by byte
+    if path.endswith('.docx'):
+        with zipfile.ZipFile(path) as z:
+            return [(info.filename, z.read(info)) for info in z.infolist()]
+    with open(path, 'rb') as f:
+        return f.read()
+
+def assert_same_as_full_run(tmp_path, input_path, output_path, mapping):
+    reference = run(tmp_path, input_path, "reference" + os.path.splitext(output_path)[1], mapping, False)
+    assert contents(output_path) == contents(reference)
+
+@pytest.fixture(params=['.txt', '.docx'])
+def book(request, tmp_path):
+    # (input path, writer) of a fresh input file of the parametrized type
+    writer = write_txt if request.param == '.txt' else write_docx
+    input_path = str(tmp_path / ("input" + request.param))
+    writer(input_path, make_lines(random.Random(1), 400))
+    return input_path, writer
+
+def test_first_run_is_a_full_run(tmp_path, book):
+    input_path, _ = book
+    first, _ = glossary_versions()
+    output_path = run(tmp_path, input_path, "output" + os.path.splitext(input_path)[1], first, True)
+    assert os.path.exists(ctr.incremental_state_path(output_path))
+    assert_same_as_full_run(tmp_path, input_path, output_path, first)
+
+def test_glossary_add_change_remove(tmp_path, book):
+    input_path, _ = book
+    first, second = glossary_versions()
+    output_name = "output" + os.path.splitext(input_path)[1]
+    run(tmp_path, input_path, output_name, first, True)
+    timer = ctr.StageTimer()
+    output_path = run(tmp_path, input_path, output_name, second, True, timer)
+    assert_same_as_full_run(tmp_path, input_path, output_path, second)
+    # only part of the book was replaced again
+    assert 0 < timer.incremental[2] < timer.incremental[1]
+
+@pytest.mark.parametrize("change", ["added", "changed", "removed"])
+def test_single_glossary_change(tmp_path, book, change):
+    input_path, _ = book
+    first, _ = glossary_versions()
+    second = dict(first)
+    if change == "added":
+        second["宙洪荒日"] = "added"
+    elif change == "changed":
+        second[list(first)[3]] = "changed"
+    else:
+        del second[list(first)[3]]
+    output_name = "output" + os.path.splitext(input_path)[1]
+    run(tmp_path, input_path, output_name, first, True)
+    output_path = run(tmp_path, input_path, output_name, second, True)
+    assert_same_as_full_run(tmp_path, input_path, output_path, second)
+
+def test_unchanged_glossary_reuses_everything(tmp_path, book):
+    input_path, _ = book
+    first, _ = glossary_versions()
+    output_name = "output" + os.path.splitext(input_path)[1]
+    run(tmp_path, input_path, output_name, first, True)
+    timer = ctr.StageTimer()
+    output_path = run(tmp_path, input_path, output_name, first, True, timer)
+    assert timer.incremental[2] == 0
+    assert_same_as_full_run(tmp_path, input_path, output_path, first)
+
+def test_edited_input(tmp_path, book):
+    input_path, writer = book
+    first, second = glossary_versions()
+    output_name = "output" + os.path.splitext(input_path)[1]
+    run(tmp_path, input_path, output_name, first, True)
+    lines = make_lines(random.Random(1), 400)
+    lines[10] = "天地玄黄" + lines[10]
+    del lines[50:53]
+    lines.insert(200, "宇宙洪荒日月")
+    lines.extend(["盈昃辰宿", "列张"])
+    writer(input_path, lines)
+    output_path = run(tmp_path, input_path, output_name, first, True)
+    assert_same_as_full_run(tmp_path, input_path, output_path, first)
+    output_path = run(tmp_path, input_path, output_name, second, True)
+    assert_same_as_full_run(tmp_path, input_path, output_path, second)
+
+@pytest.mark.parametrize("state", ["{not json", "", "[]", '{"version": 1}', "wrong kind", "other version"])
+def test_corrupt_state(tmp_path, book, state):
+    input_path, _ = book
+    first, second = glossary_versions()
+    output_name = "output" + os.path.splitext(input_path)[1]
+    output_path = run(tmp_path, input_path, output_name, first, True)
+    state_path = ctr.incremental_state_path(output_path)
+    if state in ("wrong kind", "other version"):
+        with open(state_path, encoding='utf-8') as f:
+            saved = json.load(f)
+        saved['kind' if state == "wrong kind" else 'version'] = "something else"
+        state = json.dumps(saved)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        f.write(state)
+    timer = ctr.StageTimer()
+    run(tmp_path, input_path, output_name, second, True, timer)
+    assert timer.incremental[2] == timer.incremental[1]
+    assert_same_as_full_run(tmp_path, input_path, output_path, second)
+
+def test_state_left_by_a_full_run_is_not_trusted(tmp_path, book):
+    # a full run with another glossary overwrites the output: the old state no longer describes it
+    input_path, _ = book
+    first, second = glossary_versions()
+    output_name = "output" + os.path.splitext(input_path)[1]
+    output_path = run(tmp_path, input_path, output_name, first, True)
+    run(tmp_path, input_path, output_name, second, False)
+    assert not os.path.exists(ctr.incremental_state_path(output_path))
+    run(tmp_path, input_path, output_name, first, True)
+    assert_same_as_full_run(tmp_path, input_path, output_path, first)
+
+def test_stale_state_of_another_output(tmp_path, book):
+    # output replaced by another file (same length, other glossary) while the state stayed behind
+    input_path, _ = book
+    first, second = glossary_versions()
+    extension = os.path.splitext(input_path)[1]
+    output_path = run(tmp_path, input_path, "output" + extension, first, True)
+    state_path = ctr.incremental_state_path(output_path)
+    with open(state_path, 'rb') as f:
+        state = f.read()
+    other = run(tmp_path, input_path, "other" + extension, second, False)
+    os.replace(other, output_path)
+    with open(state_path, 'wb') as f:
+        f.write(state)
+    run(tmp_path, input_path, "output" + extension, first, True)
+    assert_same_as_full_run(tmp_path, input_path, output_path, first)
+
+def test_edited_output(tmp_path):
+    # a line no key matches ("第5章 ok"), fixed by hand in the previous output: not copied into the new output
+    input_path = str(tmp_path / "input.txt")
+    write_txt(input_path, make_lines(random.Random(1), 400))
+    first, second = glossary_versions()
+    output_path = run(tmp_path, input_path, "output.txt", first, True)
+    with open(output_path, encoding='utf-8') as f:
+        lines = f.readlines()
+    lines[5] = "edited by hand\n"
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    run(tmp_path, input_path, "output.txt", second, True)
+    assert_same_as_full_run(tmp_path, input_path, output_path, second)